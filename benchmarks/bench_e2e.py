@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""End-to-end benchmarks against a simulated repeater.
+
+A Lutron object connects over TCP to a FakeRepeater on localhost and this
+measures:
+
+  inbound_events_per_second: status lines pushed by the repeater, through
+      Lutron._recv and handle_update, to a subscriber.
+  outbound_commands_per_second: commands sent with Lutron.send() and
+      Output.set_level() until the repeater has read all of them.
+  query_latency: round trip percentiles of Output.level reads that have to
+      query the repeater, with --callers threads reading concurrently.
+  connect: the time to the first connect and to reconnect after the repeater
+      drops the connection (this includes the connection's reconnect backoff).
+
+Results are printed as JSON. As with bench_parser.py, --save-baseline records
+them and --baseline compares a later run against the recorded numbers:
+
+    python benchmarks/bench_e2e.py --save-baseline e2e.json
+    python benchmarks/bench_e2e.py --baseline e2e.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks_common import make_lutron
+from fake_repeater import FakeRepeater
+from generate_xml_db import generate_project
+from pylutron.entities import Output
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pct(p):
+        return samples[min(int(len(samples) * p / 100.0), len(samples) - 1)]
+
+    return {
+        "p50_ms": round(pct(50) * 1000, 3),
+        "p90_ms": round(pct(90) * 1000, 3),
+        "p99_ms": round(pct(99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def _connect(repeater, xml_path):
+    lutron = make_lutron(repeater.host, repeater.port)
+    lutron.load_xml_db(cache_path=xml_path)
+    start = time.perf_counter()
+    lutron.connect()
+    return lutron, time.perf_counter() - start
+
+
+def bench_inbound(repeater, lutron, outputs, count):
+    received = [0]
+    done = threading.Event()
+
+    def handler(output, context, event, params):
+        received[0] += 1
+        if received[0] >= count:
+            done.set()
+
+    for output in outputs:
+        output.subscribe(handler, None)
+    lines = b"".join(
+        b"~OUTPUT,%d,1,%d.00\r\n" % (outputs[i % len(outputs)].id, i % 101)
+        for i in range(count)
+    )
+    start = time.perf_counter()
+    repeater.push(lines)
+    if not done.wait(60):
+        raise RuntimeError("Only %d of %d events arrived" % (received[0], count))
+    elapsed = time.perf_counter() - start
+    for output in outputs:
+        output._subscribers = None
+    return int(count / elapsed)
+
+
+def bench_outbound(repeater, lutron, outputs, count):
+    repeater.echo = False
+    results = {}
+    levels = [float(i % 101) for i in range(1000)]
+
+    def lutron_send():
+        send = lutron.send
+        for i in range(count):
+            output = outputs[i % len(outputs)]
+            send(lutron.OP_EXECUTE, "OUTPUT", output.id, 1, "%.2f" % levels[i % 1000])
+
+    def output_set_level():
+        for i in range(count):
+            outputs[i % len(outputs)].set_level(levels[i % 1000])
+
+    for name, case in (
+        ("lutron_send", lutron_send),
+        ("output_set_level", output_set_level),
+    ):
+        base = repeater.lines_received
+        start = time.perf_counter()
+        case()
+        if not repeater.wait_for_lines(base + count, 60):
+            raise RuntimeError("The repeater didn't receive all the commands")
+        results[name] = int(count / (time.perf_counter() - start))
+    repeater.echo = True
+    return results
+
+
+def bench_queries(lutron, outputs, callers, count):
+    samples = []
+    timeouts = [0]
+    lock = threading.Lock()
+
+    def caller(mine):
+        local = []
+        missed = 0
+        for i in range(count):
+            output = mine[i % len(mine)]
+            output._state_time = None
+            start = time.perf_counter()
+            output.level
+            local.append(time.perf_counter() - start)
+            if output._state_time is None:
+                missed += 1
+        with lock:
+            samples.extend(local)
+            timeouts[0] += missed
+
+    threads = [
+        threading.Thread(target=caller, args=(outputs[i::callers],))
+        for i in range(callers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    result = _percentiles(samples)
+    result["queries_per_second"] = int(len(samples) / elapsed)
+    result["timeouts"] = timeouts[0]
+    return result
+
+
+def bench_reconnect(repeater, lutron, count):
+    # Every dropped connection logs the exception that detected it.
+    logging.getLogger("pylutron").setLevel(logging.CRITICAL)
+    samples = []
+    for _ in range(count):
+        connects = lutron.metrics.connects
+        start = time.perf_counter()
+        repeater.drop_clients()
+        while lutron.metrics.connects == connects:
+            if time.perf_counter() - start > 30:
+                raise RuntimeError("Didn't reconnect")
+            time.sleep(0.001)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def run(args):
+    xml_db = generate_project(floors=1, rooms_per_floor=args.rooms)
+    fd, xml_path = tempfile.mkstemp(suffix=".xml")
+    repeater = FakeRepeater(login_delay=args.login_delay)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(xml_db)
+        lutron, connect_seconds = _connect(repeater, xml_path)
+        outputs = [o for o in lutron.outputs if type(o) is Output]
+        return {
+            "inbound_events_per_second": bench_inbound(
+                repeater, lutron, outputs, args.count
+            ),
+            "outbound_commands_per_second": bench_outbound(
+                repeater, lutron, outputs, args.count
+            ),
+            "query_latency": bench_queries(lutron, outputs, args.callers, args.queries),
+            "connect": {
+                "connect_ms": round(connect_seconds * 1000, 3),
+                "login_ms": round(lutron.metrics.login_seconds * 1000, 3),
+                "reconnect": bench_reconnect(repeater, lutron, args.reconnects),
+            },
+        }
+    finally:
+        repeater.close()
+        os.unlink(xml_path)
+
+
+def _flatten(results, prefix=""):
+    for key, value in sorted(results.items()):
+        if isinstance(value, dict):
+            yield from _flatten(value, prefix + key + ".")
+        else:
+            yield prefix + key, value
+
+
+def compare(results, baseline):
+    """Prints the ratio of each metric against the baseline."""
+    base = dict(_flatten(baseline))
+    for metric, value in _flatten(results):
+        if base.get(metric):
+            print(
+                "%-50s %12s -> %12s (%.2fx)"
+                % (metric, base[metric], value, value / base[metric]),
+                file=sys.stderr,
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--rooms", type=int, default=8)
+    parser.add_argument("--callers", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200, help="per caller")
+    parser.add_argument("--reconnects", type=int, default=3)
+    parser.add_argument("--login-delay", type=float, default=0.0)
+    parser.add_argument("--baseline", help="JSON file to compare against")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
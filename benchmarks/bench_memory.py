@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Measures the memory footprint of a loaded Lutron project.
+
+Reports the memory retained by the entity graph and its registry once parsing
+is done (the XML tree itself is freed), the average footprint per entity, and
+the shallow size of one instance of each entity class (including its __dict__,
+if any).
+
+    python benchmarks/bench_memory.py --preset xlarge
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from benchmarks_common import count_entities, make_lutron
+from generate_xml_db import PRESETS, generate_project
+from pylutron.xml_parser import LutronXmlDbParser
+
+
+def _shallow_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def _sample_instances(areas):
+    """Returns class name -> one instance, for every entity class in areas."""
+    samples = {}
+    for area in areas:
+        samples.setdefault("Area", area)
+        if area.occupancy_group:
+            samples.setdefault("OccupancyGroup", area.occupancy_group)
+        for entity in area.outputs + area.keypads + area.sensors:
+            samples.setdefault(type(entity).__name__, entity)
+        for keypad in area.keypads:
+            for component in keypad.buttons + keypad.leds:
+                samples.setdefault(type(component).__name__, component)
+    return samples
+
+
+def bench_preset(preset, lazy=False):
+    xml_db = generate_project(**PRESETS[preset])
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    lutron = make_lutron()
+    parser = LutronXmlDbParser(lutron=lutron, xml_db_str=xml_db, lazy=lazy)
+    parser.parse()
+    areas, registry = parser.areas, parser.registry
+    del parser
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    counts = count_entities(areas, materialize=False)
+    entities = sum(counts.values())
+    result = {
+        "retained_bytes": retained,
+        "entities": entities,
+        "bytes_per_entity": round(retained / entities, 1),
+    }
+    if not lazy:
+        result["instance_bytes"] = {
+            name: _shallow_size(obj)
+            for name, obj in sorted(_sample_instances(areas).items())
+        }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS))
+    parser.add_argument("--lazy", action="store_true", help="use lazy parsing")
+    args = parser.parse_args(argv)
+    presets = args.preset or list(PRESETS)
+    results = {p: bench_preset(p, lazy=args.lazy) for p in presets}
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Benchmarks LutronXmlDbParser on synthetic projects.
+
+For every project size this reports the parse time (best of --repeat runs),
+the peak memory allocated while parsing (tracemalloc) and the number of objects
+the parse leaves alive (entities and gc-tracked objects).
+
+Results are printed as JSON. Use --save-baseline to record them and --baseline
+to compare a later run against the recorded numbers:
+
+    python benchmarks/bench_parser.py --save-baseline benchmarks/baselines/parser.json
+    python benchmarks/bench_parser.py --baseline benchmarks/baselines/parser.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks_common import count_entities, make_lutron  # noqa: E402
+from generate_xml_db import PRESETS, generate_project  # noqa: E402
+from pylutron.xml_parser import LutronXmlDbParser  # noqa: E402
+
+
+def _parse(xml_db, lazy):
+    lutron = make_lutron()
+    parser = LutronXmlDbParser(lutron=lutron, xml_db_str=xml_db, lazy=lazy)
+    parser.parse()
+    return lutron, parser
+
+
+def bench_preset(preset, repeat=5, lazy=False):
+    """Runs the benchmark for one preset and returns the results dict."""
+    xml_db = generate_project(**PRESETS[preset])
+
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        _parse(xml_db, lazy)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    lutron, parser = _parse(xml_db, lazy)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    objects_after = len(gc.get_objects())
+
+    counts = count_entities(parser.areas, materialize=False)
+    return {
+        "xml_bytes": len(xml_db),
+        "parse_seconds": round(best, 6),
+        "peak_bytes": peak,
+        "gc_objects": objects_after - objects_before,
+        "entities": counts,
+    }
+
+
+def compare(results, baseline):
+    """Prints the ratio of each metric against the baseline."""
+    for preset, result in results.items():
+        base = baseline.get(preset)
+        if not base:
+            continue
+        for metric in ("parse_seconds", "peak_bytes", "gc_objects"):
+            if base.get(metric):
+                ratio = result[metric] / base[metric]
+                print(
+                    "%-8s %-14s %12s -> %12s (%.2fx)"
+                    % (preset, metric, base[metric], result[metric], ratio),
+                    file=sys.stderr,
+                )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--preset",
+        action="append",
+        choices=sorted(PRESETS),
+        help="project size(s) to run (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lazy", action="store_true", help="use lazy parsing")
+    parser.add_argument("--baseline", help="JSON file to compare against")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    presets = args.preset or list(PRESETS)
+    results = {p: bench_preset(p, repeat=args.repeat, lazy=args.lazy) for p in presets}
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Benchmarks the command send path (commands per second).
+
+The connection is replaced by one that encodes each command the way the real
+connection does and drops it, so this measures building and encoding commands
+in pylutron, not network I/O.
+
+    python benchmarks/bench_send.py --count 200000
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks_common import make_lutron
+from generate_xml_db import generate_project
+from pylutron.xml_parser import LutronXmlDbParser
+
+
+class _NullConnection(object):
+    """Stands in for LutronConnection; encodes and discards commands."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def send(self, cmd):
+        self.bytes_sent += len(cmd.encode("ascii") + b"\r\n")
+
+    def send_many(self, cmds):
+        self.bytes_sent += len(b"".join(c.encode("ascii") + b"\r\n" for c in cmds))
+
+    def send_raw(self, data):
+        self.bytes_sent += len(data)
+
+
+def _load():
+    lutron = make_lutron()
+    parser = LutronXmlDbParser(
+        lutron=lutron,
+        xml_db_str=generate_project(floors=1, rooms_per_floor=4, shade_every=2),
+    )
+    parser.parse()
+    lutron._areas = parser.areas
+    lutron._outputs = [o for a in parser.areas for o in a.outputs]
+    lutron._conn = _NullConnection()
+    return lutron
+
+
+def _cases(lutron):
+    outputs = [o for o in lutron._outputs if type(o).__name__ == "Output"]
+    shades = [o for o in lutron._outputs if type(o).__name__ == "Shade"]
+    keypad = next(k for a in lutron.areas for k in a.keypads)
+    output, shade = outputs[0], shades[0]
+    led, button = keypad.leds[0], keypad.buttons[0]
+    levels = [float(i % 101) for i in range(1000)]
+
+    def set_level(n):
+        for i in range(n):
+            output.set_level(levels[i % 1000])
+
+    def set_level_fade(n):
+        for i in range(n):
+            output.set_level(levels[i % 1000], fade_time=2.5)
+
+    def query_level(n):
+        query = output._Output__do_query_level
+        for _ in range(n):
+            query()
+
+    def led_state(n):
+        for i in range(n):
+            led.state = i & 1
+
+    def button_tap(n):
+        for _ in range(n // 2):
+            button.tap()
+
+    def shade_stop(n):
+        for _ in range(n):
+            shade.stop()
+
+    def set_levels_batch(n):
+        for i in range(n // len(outputs)):
+            lutron.set_levels(outputs, levels[i % 1000])
+
+    def generic_send(n):
+        send = lutron.send
+        for i in range(n):
+            send(lutron.OP_EXECUTE, "OUTPUT", output.id, 1, "%.2f" % levels[i % 1000])
+
+    return {
+        "output_set_level": set_level,
+        "output_set_level_fade": set_level_fade,
+        "output_query_level": query_level,
+        "led_set_state": led_state,
+        "button_tap": button_tap,
+        "shade_stop": shade_stop,
+        "set_levels_batch": set_levels_batch,
+        "lutron_send": generic_send,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    lutron = _load()
+    results = {}
+    for name, case in _cases(lutron).items():
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            case(args.count)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = int(args.count / best)
+    print(json.dumps({"commands_per_second": results}, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
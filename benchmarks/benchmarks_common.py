@@ -0,0 +1,48 @@
+"""Helpers shared by the benchmark scripts."""
+
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylutron import Lutron  # noqa: E402
+
+# The synthetic projects have floors without occupancy groups, which the parser
+# warns about. Keep the benchmark output readable.
+logging.getLogger("pylutron").setLevel(logging.ERROR)
+
+
+def make_lutron(host="localhost", port=23):
+    """Returns a Lutron object that hasn't connected to anything."""
+    return Lutron(host, "lutron", "integration", port=port)
+
+
+def count_entities(areas, materialize=True):
+    """Returns a dict of entity class name -> count reachable from areas.
+
+    With materialize=False, lazily added components and sensors are counted
+    as pending instead of being built.
+    """
+    counts = {"Area": len(areas)}
+
+    def add(name, n=1):
+        counts[name] = counts.get(name, 0) + n
+
+    for area in areas:
+        if area.occupancy_group:
+            add("OccupancyGroup")
+        for output in area.outputs:
+            add(type(output).__name__)
+        for keypad in area.keypads:
+            add("Keypad")
+            if not materialize and keypad._lazy_components is not None:
+                add("PendingComponent", len(keypad._lazy_components))
+                continue
+            add("Button", len(keypad.buttons))
+            add("Led", len(keypad.leds))
+        if not materialize and area._lazy_sensors is not None:
+            add("PendingSensor", len(area._lazy_sensors))
+        else:
+            add("MotionSensor", len(area.sensors))
+    return counts
@@ -0,0 +1,125 @@
+"""A simulated main repeater for the end-to-end benchmarks.
+
+It speaks enough of the integration protocol for pylutron: the telnet style
+login, level queries and commands for outputs (answered from an in-memory
+table), and it can push arbitrary status lines to the connected clients.
+"""
+
+import socket
+import threading
+
+USER_PROMPT = b"login: "
+PW_PROMPT = b"password: "
+PROMPT = b"GNET> "
+
+
+class FakeRepeater(object):
+    """Listens on host:port (port 0 picks a free one, see .port).
+
+    echo: whether #OUTPUT level commands are echoed back as ~OUTPUT status
+        lines, like the real repeater does with monitoring enabled.
+    login_delay: seconds to wait before accepting the password, to mimic the
+        latency of a real login.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, echo=True, login_delay=0.0):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen(8)
+        self.host, self.port = self._server.getsockname()[:2]
+        self.echo = echo
+        self.login_delay = login_delay
+        self._lock = threading.Lock()
+        self._clients = []
+        self._logged_in = threading.Condition(self._lock)
+        self._levels = {}
+        # Number of command lines received from clients after login.
+        self.lines_received = 0
+        self.logins = 0
+        self._received = threading.Condition(self._lock)
+        thread = threading.Thread(target=self._accept_loop, daemon=True)
+        thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        reader = conn.makefile("rb")
+        try:
+            conn.sendall(USER_PROMPT)
+            reader.readline()
+            conn.sendall(PW_PROMPT)
+            reader.readline()
+            if self.login_delay:
+                threading.Event().wait(self.login_delay)
+            conn.sendall(b"\r\n" + PROMPT)
+            with self._lock:
+                self._clients.append(conn)
+                self.logins += 1
+                self._logged_in.notify_all()
+            for line in reader:
+                self._handle(conn, line.strip())
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if conn in self._clients:
+                    self._clients.remove(conn)
+            conn.close()
+
+    def _handle(self, conn, line):
+        reply = None
+        parts = line[1:].split(b",")
+        if line.startswith(b"?OUTPUT,") and len(parts) >= 3:
+            level = self._levels.get(parts[1], 0.0)
+            reply = b"~OUTPUT,%s,1,%.2f\r\n" % (parts[1], level)
+        elif line.startswith(b"#OUTPUT,") and len(parts) >= 4 and parts[2] == b"1":
+            self._levels[parts[1]] = float(parts[3])
+            if self.echo:
+                reply = b"~OUTPUT,%s,1,%s\r\n" % (parts[1], parts[3])
+        with self._lock:
+            self.lines_received += 1
+            self._received.notify_all()
+        if reply is not None:
+            conn.sendall(reply)
+
+    def push(self, data):
+        """Sends data (bytes, CRLF terminated lines) to every client."""
+        with self._lock:
+            clients = list(self._clients)
+        for conn in clients:
+            conn.sendall(data)
+
+    def drop_clients(self):
+        """Closes the connection of every client, e.g. to force a reconnect."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for conn in clients:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def wait_for_logins(self, count, timeout=10.0):
+        """Waits until count logins happened in total. Returns True if so."""
+        with self._lock:
+            return self._logged_in.wait_for(lambda: self.logins >= count, timeout)
+
+    def wait_for_lines(self, count, timeout=30.0):
+        """Waits until count command lines were received in total."""
+        with self._lock:
+            return self._received.wait_for(
+                lambda: self.lines_received >= count, timeout
+            )
+
+    def close(self):
+        self._server.close()
+        self.drop_clients()
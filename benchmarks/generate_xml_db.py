@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Generates synthetic, but realistically shaped, DbXmlInfo.xml documents.
+
+The layout mirrors what a RadioRA 2 repeater serves: a top-level project Area
+containing floors, each floor containing rooms. Every room has outputs, device
+groups with keypads (buttons and LEDs), motion sensors and an occupancy group.
+
+Usage:
+    python benchmarks/generate_xml_db.py --preset large -o DbXmlInfo.xml
+"""
+
+import argparse
+import sys
+from xml.sax.saxutils import quoteattr
+
+# Named project sizes used by the benchmarks. "xlarge" is ~10k outputs.
+PRESETS = {
+    "small": dict(floors=1, rooms_per_floor=5, outputs_per_room=4),
+    "medium": dict(floors=3, rooms_per_floor=15, outputs_per_room=8),
+    "large": dict(floors=5, rooms_per_floor=40, outputs_per_room=10),
+    "xlarge": dict(floors=10, rooms_per_floor=50, outputs_per_room=20),
+}
+
+_OUTPUT_TYPES = ("INC", "MLV", "ELV", "NON_DIM", "AUTO_DETECT", "CCO_PULSED")
+_KEYPAD_TYPES = ("SEETOUCH_KEYPAD", "HYBRID_SEETOUCH_KEYPAD", "PICO_KEYPAD")
+
+
+class _Ids(object):
+    """Hands out unique integration ids and UUIDs."""
+
+    def __init__(self):
+        self._next_id = 1
+        self._next_uuid = 1
+
+    def integration_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def uuid(self):
+        self._next_uuid += 1
+        return self._next_uuid
+
+
+def generate_project(
+    floors=3,
+    rooms_per_floor=10,
+    outputs_per_room=6,
+    device_groups_per_room=2,
+    keypads_per_device_group=1,
+    buttons_per_keypad=6,
+    leds_per_keypad=6,
+    sensors_per_room=1,
+    shade_every=10,
+    name="Synthetic Project",
+):
+    """Returns the XML document (bytes) for a synthetic project.
+
+    Every shade_every-th output is a SYSTEM_SHADE (0 disables shades).
+    """
+    ids = _Ids()
+    out = []
+    groups = []
+    w = out.append
+
+    def area_open(area_name, occupancy_group):
+        w(
+            '<Area Name=%s UUID="%d" IntegrationID="%d" '
+            'OccupancyGroupAssignedToID="%s">'
+            % (quoteattr(area_name), ids.uuid(), ids.integration_id(), occupancy_group)
+        )
+
+    w('<?xml version="1.0" encoding="UTF-8"?>')
+    w("<Project>")
+    w('<ProjectName ProjectName=%s UUID="1"/>' % quoteattr(name))
+    w("<GUID>0123456789abcdef0123456789abcdef</GUID>")
+    w("<Areas>")
+    area_open(name, 0)
+    w("<DeviceGroups/><Scenes/><ShadeGroups/><Outputs/><Areas>")
+    output_count = 0
+    for floor in range(floors):
+        area_open("Floor %d" % (floor + 1), 0)
+        w("<DeviceGroups/><Scenes/><ShadeGroups/><Outputs/><Areas>")
+        for room in range(rooms_per_floor):
+            room_name = "Room %d.%d" % (floor + 1, room + 1)
+            group_number = len(groups) + 1
+            groups.append(group_number)
+            area_open(room_name, group_number)
+
+            w("<DeviceGroups>")
+            for dg in range(device_groups_per_room):
+                w('<DeviceGroup Name="%s Entry %d"><Devices>' % (room_name, dg + 1))
+                for kp in range(keypads_per_device_group):
+                    keypad_type = _KEYPAD_TYPES[(dg + kp) % len(_KEYPAD_TYPES)]
+                    w(
+                        '<Device Name="Keypad %d" UUID="%d" IntegrationID="%d" '
+                        'DeviceType="%s"><Components>'
+                        % (kp + 1, ids.uuid(), ids.integration_id(), keypad_type)
+                    )
+                    for b in range(buttons_per_keypad):
+                        w(
+                            '<Component ComponentNumber="%d" ComponentType="BUTTON">'
+                            '<Button Engraving="Scene %d" ButtonType="Toggle" '
+                            'Direction="Press" UUID="%d"/></Component>'
+                            % (b + 1, b + 1, ids.uuid())
+                        )
+                    for led in range(leds_per_keypad):
+                        w(
+                            '<Component ComponentNumber="%d" ComponentType="LED">'
+                            '<LED UUID="%d"/></Component>' % (81 + led, ids.uuid())
+                        )
+                    w("</Components></Device>")
+                w("</Devices></DeviceGroup>")
+            for s in range(sensors_per_room):
+                w(
+                    '<Device Name="Motion %d" UUID="%d" IntegrationID="%d" '
+                    'DeviceType="MOTION_SENSOR"/>'
+                    % (s + 1, ids.uuid(), ids.integration_id())
+                )
+            w("</DeviceGroups><Scenes/><ShadeGroups/>")
+
+            w("<Outputs>")
+            for o in range(outputs_per_room):
+                output_count += 1
+                if shade_every and output_count % shade_every == 0:
+                    output_type, watts = "SYSTEM_SHADE", 0
+                else:
+                    output_type = _OUTPUT_TYPES[o % len(_OUTPUT_TYPES)]
+                    watts = 60 + 10 * (o % 10)
+                w(
+                    '<Output Name="%s Load %d" UUID="%d" IntegrationID="%d" '
+                    'OutputType="%s" Wattage="%d"/>'
+                    % (
+                        room_name,
+                        o + 1,
+                        ids.uuid(),
+                        ids.integration_id(),
+                        output_type,
+                        watts,
+                    )
+                )
+            w("</Outputs></Area>")
+        w("</Areas></Area>")
+    w("</Areas></Area></Areas>")
+
+    w("<OccupancyGroups>")
+    for group_number in groups:
+        w(
+            '<OccupancyGroup UUID="%d" OccupancyGroupNumber="%d"/>'
+            % (ids.uuid(), group_number)
+        )
+    w("</OccupancyGroups>")
+    w("</Project>")
+    return "\n".join(out).encode("utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--floors", type=int)
+    parser.add_argument("--rooms-per-floor", type=int)
+    parser.add_argument("--outputs-per-room", type=int)
+    parser.add_argument("--device-groups-per-room", type=int)
+    parser.add_argument("--keypads-per-device-group", type=int)
+    parser.add_argument("--buttons-per-keypad", type=int)
+    parser.add_argument("--leds-per-keypad", type=int)
+    parser.add_argument("--sensors-per-room", type=int)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(PRESETS[args.preset])
+    for key, value in vars(args).items():
+        if key not in ("preset", "output") and value is not None:
+            kwargs[key] = value
+    xml_db = generate_project(**kwargs)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(xml_db)
+    else:
+        sys.stdout.buffer.write(xml_db)
+
+
+if __name__ == "__main__":
+    main()
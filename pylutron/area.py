@@ -1,14 +1,48 @@
+from pylutron.entities import MotionSensor
+from pylutron.entities.keypad import _sync_leds
+
+
 class Area(object):
     """An area (i.e. a room) that contains devices/outputs/etc."""
 
-    def __init__(self, lutron, name, integration_id, occupancy_group):
+    __slots__ = (
+        "_lutron",
+        "_name",
+        "_integration_id",
+        "_occupancy_group",
+        "_parent",
+        "_children",
+        "_outputs",
+        "_keypads",
+        "_sensors",
+        "_shade_groups",
+        "_views",
+        "_subtree_outputs",
+        "_subtree_keypads",
+        "_lazy_sensors",
+    )
+
+    def __init__(self, lutron, name, integration_id, occupancy_group, parent=None):
         self._lutron = lutron
         self._name = name
         self._integration_id = integration_id
         self._occupancy_group = occupancy_group
+        self._parent = parent
+        self._children = []
         self._outputs = []
         self._keypads = []
         self._sensors = []
+        self._shade_groups = []
+        # Cached immutable tuples returned by the children/outputs/keypads/sensors
+        # properties, keyed by attribute name. Reset whenever a list changes.
+        self._views = None
+        # Outputs/keypads of this area and all its descendants, computed by
+        # _update_subtree() once the tree is complete.
+        self._subtree_outputs = ()
+        self._subtree_keypads = ()
+        # integration_id -> MotionSensor constructor args (after lutron) for
+        # sensors that are built on first access
+        self._lazy_sensors = None
         if occupancy_group:
             occupancy_group._bind_area(self)
 
@@ -16,16 +50,114 @@ class Area(object):
         """Adds an output object that's part of this area, only used during
         initial parsing."""
         self._outputs.append(output)
+        self._views = None
 
     def add_keypad(self, keypad):
         """Adds a keypad object that's part of this area, only used during
         initial parsing."""
         self._keypads.append(keypad)
+        self._views = None
+
+    def add_child(self, area):
+        """Adds a nested area, only used during initial parsing."""
+        self._children.append(area)
+        self._views = None
+
+    def add_shade_group(self, shade_group):
+        """Adds a shade group that's part of this area, only used during initial
+        parsing."""
+        self._shade_groups.append(shade_group)
+        self._views = None
+
+    def _set_contents(
+        self, name, parent, children, outputs, keypads, sensors, shade_groups=()
+    ):
+        """Replaces everything in this area (used on reload). Call
+        _update_subtree() on the root areas afterwards."""
+        self._name = name
+        self._parent = parent
+        self._children = list(children)
+        self._outputs = list(outputs)
+        self._keypads = list(keypads)
+        self._sensors = list(sensors)
+        self._shade_groups = list(shade_groups)
+        self._lazy_sensors = None
+        self._views = None
+
+    def _view(self, attr):
+        """Returns a cached tuple of the list stored in attr."""
+        views = self._views
+        if views is None:
+            views = self._views = {}
+        view = views.get(attr)
+        if view is None:
+            view = views[attr] = tuple(getattr(self, attr))
+        return view
+
+    def _update_subtree(self):
+        """Recomputes the subtree output and keypad tuples of this area and all
+        its descendants. Called once the area tree is complete."""
+        outputs = list(self._outputs)
+        keypads = list(self._keypads)
+        for child in self._children:
+            child._update_subtree()
+            outputs.extend(child._subtree_outputs)
+            keypads.extend(child._subtree_keypads)
+        self._subtree_outputs = tuple(outputs)
+        self._subtree_keypads = tuple(keypads)
 
     def add_sensor(self, sensor):
         """Adds a motion sensor object that's part of this area, only used during
         initial parsing."""
         self._sensors.append(sensor)
+        self._views = None
+
+    def add_lazy_sensor(self, args):
+        """Adds a motion sensor that is only constructed when first needed, either
+        when sensors are accessed or when an event for it arrives. Only used
+        during initial parsing.
+
+        args: MotionSensor constructor arguments (name, integration_id, uuid)."""
+        integration_id = args[1]
+        if self._lazy_sensors is None:
+            self._lazy_sensors = {}
+        self._lazy_sensors[integration_id] = args
+        self._lutron.register_lazy_id(
+            MotionSensor._CMD_TYPE,
+            integration_id,
+            lambda: self._get_lazy_sensor(integration_id),
+        )
+
+    def _get_lazy_sensor(self, integration_id):
+        """Builds (if needed) and returns the lazily added sensor with the given
+        integration id."""
+        with self._lutron._lazy_lock:
+            for sensor in self._sensors:
+                if sensor.id == integration_id:
+                    return sensor
+            sensor = MotionSensor(self._lutron, *self._lazy_sensors[integration_id])
+            self._sensors.append(sensor)
+            self._views = None
+            return sensor
+
+    def _materialize_sensors(self):
+        """Builds all the lazily added sensors, preserving XML order."""
+        if self._lazy_sensors is None:
+            return
+        with self._lutron._lazy_lock:
+            if self._lazy_sensors is None:
+                return
+            built = {sensor.id: sensor for sensor in self._sensors}
+            self._sensors = [
+                (
+                    built[integration_id]
+                    if integration_id in built
+                    else MotionSensor(self._lutron, *args)
+                )
+                for integration_id, args in self._lazy_sensors.items()
+            ]
+            self._lazy_sensors = None
+            self._views = None
 
     @property
     def name(self):
@@ -42,17 +174,57 @@ class Area(object):
         """Returns the OccupancyGroup for this area, or None."""
         return self._occupancy_group
 
+    @property
+    def parent(self):
+        """Returns the Area this area is nested in, or None for a top-level area."""
+        return self._parent
+
+    @property
+    def children(self):
+        """Return the tuple of the Areas directly nested in this area."""
+        return self._view("_children")
+
+    @property
+    def subtree_outputs(self):
+        """Return the tuple of the Outputs in this area and all nested areas."""
+        return self._subtree_outputs
+
+    @property
+    def subtree_keypads(self):
+        """Return the tuple of the Keypads in this area and all nested areas."""
+        return self._subtree_keypads
+
+    def set_level(self, new_level, subtree=True, fade_time=None, delay=None):
+        """Sets the level of all the outputs in this area (and, with subtree, all
+        nested areas) with a single write to the controller, optionally fading
+        over fade_time seconds after delay seconds."""
+        outputs = self._subtree_outputs if subtree else self._outputs
+        self._lutron.set_levels(outputs, new_level, fade_time, delay)
+
+    def sync_leds(self, timeout=1.0, subtree=False):
+        """Queries the LED state of all the keypads in this area (and, with
+        subtree, all nested areas) in one batch and waits up to timeout seconds
+        for all of them to report. Returns True if every LED reported."""
+        keypads = self._subtree_keypads if subtree else self._keypads
+        return _sync_leds(self._lutron, keypads, timeout)
+
     @property
     def outputs(self):
         """Return the tuple of the Outputs from this area."""
-        return tuple(output for output in self._outputs)
+        return self._view("_outputs")
 
     @property
     def keypads(self):
         """Return the tuple of the Keypads from this area."""
-        return tuple(keypad for keypad in self._keypads)
+        return self._view("_keypads")
+
+    @property
+    def shade_groups(self):
+        """Return the tuple of the ShadeGroups from this area."""
+        return self._view("_shade_groups")
 
     @property
     def sensors(self):
         """Return the tuple of the MotionSensors from this area."""
-        return tuple(sensor for sensor in self._sensors)
+        self._materialize_sensors()
+        return self._view("_sensors")
@@ -0,0 +1,82 @@
+import threading
+
+from pylutron.logger import _LOGGER
+
+
+class BatchSubscription(object):
+    """Delivers events from many entities to one handler in batches, so a
+    consumer can handle a burst (e.g. a scene changing 100 outputs) with a
+    single call.
+
+    handler is called with a list of (entity, event, params) tuples, in the
+    order the events were dispatched. With window None, a batch holds the
+    events of everything parsed from one read of the connection; events
+    dispatched from other threads (e.g. gestures, timers) are delivered right
+    away, each as a batch of its own. With a window (seconds), a batch holds the
+    events dispatched within window seconds of its first event.
+
+    handler is never called on two threads at once.
+
+    Created with Lutron.subscribe_batch(); call cancel() to unsubscribe.
+    """
+
+    def __init__(self, lutron, handler, entities=None, window=None):
+        self._lutron = lutron
+        self._handler = handler
+        self._entities = None if entities is None else set(entities)
+        self._window = window
+        self._lock = threading.Lock()
+        # Held while calling handler. Reentrant, in case handler causes an event
+        # to be dispatched on its own thread.
+        self._handler_lock = threading.RLock()
+        self._pending = []
+        self._timer = None
+        self.batches = 0
+        self.events = 0
+
+    def _add(self, entity, event, params):
+        """Called from LutronEntity._dispatch_event()."""
+        if self._entities is not None and entity not in self._entities:
+            return
+        if (
+            self._window is None
+            and threading.current_thread() is not self._lutron._conn
+        ):
+            # Leave the batch the connection thread is collecting alone.
+            self._deliver([(entity, event, params)])
+            return
+        with self._lock:
+            self._pending.append((entity, event, params))
+            if self._window is not None and self._timer is None:
+                self._timer = self._lutron._scheduler.call_later(
+                    self._window, self.flush
+                )
+
+    def flush(self):
+        """Delivers the pending events now, if there are any."""
+        with self._lock:
+            events, self._pending = self._pending, []
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if events:
+            self._deliver(events)
+
+    def _deliver(self, events):
+        with self._handler_lock:
+            self.batches += 1
+            self.events += len(events)
+            try:
+                self._handler(events)
+            except Exception:
+                self._lutron._metrics.handler_errors += 1
+                _LOGGER.exception("Error in batch handler %r" % (self._handler,))
+
+    def cancel(self):
+        """Unsubscribes; pending events are dropped."""
+        self._lutron._remove_batch_subscription(self)
+        with self._lock:
+            self._pending = []
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
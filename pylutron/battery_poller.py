@@ -0,0 +1,75 @@
+import random
+import threading
+
+from pylutron.logger import _LOGGER
+
+
+class BatteryPoller(object):
+    """Refreshes the battery and power status of all the MotionSensors in the
+    background.
+
+    Started with Lutron.start_battery_polling(). The sensors are queried one at
+    a time, round-robin, spread evenly over interval seconds: each one is polled
+    about once per interval and the repeater sees a steady trickle of queries
+    instead of bursts. Each gap is randomized by +/- jitter (a fraction of the
+    gap). Sensors that reported recently are skipped. While polling is running,
+    MotionSensor.battery_status and power_source never block.
+    """
+
+    def __init__(self, lutron, scheduler, interval=3600.0, jitter=0.2):
+        self._lutron = lutron
+        self._scheduler = scheduler
+        self._interval = interval
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._sensors = []
+        self._next = 0
+        self._call = None
+        self.queries = 0
+
+    def _all_sensors(self):
+        return [sensor for area in self._lutron.areas for sensor in area.sensors]
+
+    def _gap(self):
+        gap = self._interval / max(len(self._sensors), 1)
+        return gap * (1.0 + random.uniform(-self._jitter, self._jitter))
+
+    def start(self):
+        """Starts polling; the first query goes out within one gap."""
+        with self._lock:
+            if self._call is not None:
+                return
+            self._sensors = self._all_sensors()
+            self._next = 0
+            self._call = self._scheduler.call_later(self._gap(), self._poll)
+
+    def stop(self):
+        """Stops polling."""
+        with self._lock:
+            if self._call is not None:
+                self._call.cancel()
+                self._call = None
+
+    @property
+    def running(self):
+        """Returns True while polling."""
+        return self._call is not None
+
+    def _poll(self):
+        with self._lock:
+            if self._call is None:
+                return
+            if self._next >= len(self._sensors):
+                # New cycle, pick up sensors added or removed by a reload.
+                self._sensors = self._all_sensors()
+                self._next = 0
+            sensor = None
+            if self._sensors:
+                sensor = self._sensors[self._next]
+                self._next += 1
+            self._call = self._scheduler.call_later(self._gap(), self._poll)
+        if sensor is None or sensor._update_age < self._interval / 2:
+            return
+        _LOGGER.debug("Polling battery status of %s" % sensor.name)
+        self.queries += 1
+        sensor._do_query_battery()
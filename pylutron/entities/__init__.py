@@ -7,3 +7,4 @@ from pylutron.entities.motion_sensor import MotionSensor
 from pylutron.entities.occupancy_group import OccupancyGroup
 from pylutron.entities.output import Output
 from pylutron.entities.shade import Shade
+from pylutron.entities.shade_group import ShadeGroup
@@ -12,8 +12,11 @@ class Button(KeypadComponent):
     """This object represents a keypad button that we can trigger and handle
     events for (button presses)."""
 
+    __slots__ = ("_button_type", "_direction")
+
     _ACTION_PRESS = 3
     _ACTION_RELEASE = 4
+    _RELOAD_ATTRS = KeypadComponent._RELOAD_ATTRS + ("_button_type", "_direction")
 
     class Event(LutronEvent):
         """Button events that can be generated.
@@ -24,10 +27,32 @@ class Button(KeypadComponent):
         RELEASED: The button has been released. Not all buttons
                   generate this event.
             Params: None
+
+        The following are only generated when gestures are enabled (see
+        Lutron.enable_button_gestures()):
+
+        TAP: The button was pressed and released once. Buttons that haven't
+             reported a release yet emit it on every press instead.
+            Params: None
+
+        DOUBLE_TAP: The button was tapped twice in quick succession.
+            Params: None
+
+        LONG_PRESS: The button has been held down.
+            Params: None
+
+        HOLD_REPEAT: The button is still held after a long press; generated
+                     periodically until it is released.
+            Params:
+              count: number of repeats so far (int)
         """
 
         PRESSED = 1
         RELEASED = 2
+        TAP = 3
+        DOUBLE_TAP = 4
+        LONG_PRESS = 5
+        HOLD_REPEAT = 6
 
     def __init__(self, lutron, keypad, name, num, button_type, direction, uuid):
         """Initializes the Button class."""
@@ -62,24 +87,22 @@ class Button(KeypadComponent):
 
     def press(self):
         """Triggers a simulated button press to the Keypad."""
-        self._lutron.send(
-            # Lutron.OP_EXECUTE,
-            self._lutron.OP_EXECUTE,
-            Keypad._CMD_TYPE,
-            self._keypad.id,
-            self.component_number,
-            Button._ACTION_PRESS,
-        )
+        self._lutron.send_raw(self._action_command(Button._ACTION_PRESS))
 
     def release(self):
         """Triggers a simulated button release to the Keypad."""
-        self._lutron.send(
+        self._lutron.send_raw(self._action_command(Button._ACTION_RELEASE))
+
+    def _action_command(self, action):
+        """Returns the encoded command that performs action on this button."""
+        return self._command(
+            action,
             # Lutron.OP_EXECUTE,
             self._lutron.OP_EXECUTE,
             Keypad._CMD_TYPE,
             self._keypad.id,
             self.component_number,
-            Button._ACTION_RELEASE,
+            action,
         )
 
     def tap(self):
@@ -104,4 +127,10 @@ class Button(KeypadComponent):
             )
             return False
         self._dispatch_event(ev_map[action], {})
+        gestures = self._lutron._gestures
+        if gestures is not None:
+            if action == Button._ACTION_PRESS:
+                gestures._on_press(self)
+            else:
+                gestures._on_release(self)
         return True
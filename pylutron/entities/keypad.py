@@ -1,6 +1,56 @@
+import threading
+
 from pylutron.entities.lutron_entity import LutronEntity
 from pylutron.logger import _LOGGER
 
+# Guards the LED state masks of the keypads and the pending masks of the
+# _LedSync objects.
+_LED_SYNC_LOCK = threading.Lock()
+
+
+class _LedSync(object):
+    """An LED sync in progress: the LEDs still to report, per keypad."""
+
+    __slots__ = ("pending", "remaining", "event")
+
+    def __init__(self):
+        self.pending = {}
+        self.remaining = 0
+        self.event = threading.Event()
+
+
+def _sync_leds(lutron, keypads, timeout):
+    """Queries the state of every LED of keypads with a single write and waits
+    until all of them have reported or timeout seconds have passed.
+
+    Returns True if every LED reported in time."""
+    sync = _LedSync()
+    commands = []
+    for keypad in keypads:
+        mask = 0
+        for led in keypad.leds:
+            mask |= 1 << led.number
+            commands.append(led._query_command())
+        if mask:
+            sync.pending[keypad] = mask
+            sync.remaining += bin(mask).count("1")
+    if not commands:
+        return True
+    with _LED_SYNC_LOCK:
+        for keypad in sync.pending:
+            if keypad._led_syncs is None:
+                keypad._led_syncs = []
+            keypad._led_syncs.append(sync)
+    try:
+        lutron.send_raw(b"".join(commands))
+        return sync.event.wait(timeout)
+    finally:
+        with _LED_SYNC_LOCK:
+            for keypad in sync.pending:
+                keypad._led_syncs.remove(sync)
+                if not keypad._led_syncs:
+                    keypad._led_syncs = None
+
 
 class Keypad(LutronEntity):
     """Object representing a Lutron keypad.
@@ -9,17 +59,46 @@ class Keypad(LutronEntity):
     (and drop them on the floor).
     """
 
+    __slots__ = (
+        "_buttons",
+        "_leds",
+        "_buttons_view",
+        "_leds_view",
+        "_components",
+        "_lazy_components",
+        "_location",
+        "_integration_id",
+        "_type",
+        "_led_states",
+        "_led_syncs",
+    )
+
     _CMD_TYPE = "DEVICE"
+    _RELOAD_ATTRS = LutronEntity._RELOAD_ATTRS + (
+        "_location",
+        "_type",
+        "_integration_id",
+    )
 
     def __init__(self, lutron, name, keypad_type, location, integration_id, uuid):
         """Initializes the Keypad object."""
         super(Keypad, self).__init__(lutron, name, uuid)
         self._buttons = []
         self._leds = []
+        # Cached immutable tuples returned by buttons/leds.
+        self._buttons_view = None
+        self._leds_view = None
         self._components = {}
+        # component_num -> (component_type, component_cls, args) for components
+        # that are only built on first access (see LutronXmlDbParser lazy mode).
+        self._lazy_components = None
         self._location = location
         self._integration_id = integration_id
         self._type = keypad_type
+        # Bit n is the state of LED number n.
+        self._led_states = 0
+        # _LedSync objects waiting for LED reports from this keypad.
+        self._led_syncs = None
 
         self._lutron.register_id(Keypad._CMD_TYPE, self)
 
@@ -27,13 +106,60 @@ class Keypad(LutronEntity):
         """Adds a button that's part of this keypad. We'll use this to
         dispatch button events."""
         self._buttons.append(button)
+        self._buttons_view = None
         self._components[button.component_number] = button
 
     def add_led(self, led):
         """Add an LED that's part of this keypad."""
         self._leds.append(led)
+        self._leds_view = None
         self._components[led.component_number] = led
 
+    def add_lazy_component(self, component_type, component_num, component_cls, args):
+        """Adds a component that is only constructed when first needed, either
+        when buttons/leds are accessed or when an event for it arrives.
+
+        component_type: "BUTTON" or "LED", as in the XML ComponentType.
+        component_cls, args: the component is built as
+                             component_cls(lutron, keypad, *args).
+        """
+        if self._lazy_components is None:
+            self._lazy_components = {}
+        self._lazy_components[component_num] = (component_type, component_cls, args)
+
+    def _get_component(self, component_num):
+        """Returns the component with the given number, building it if it was
+        added lazily and hasn't been constructed yet."""
+        component = self._components.get(component_num)
+        if component is not None or self._lazy_components is None:
+            return component
+        with self._lutron._lazy_lock:
+            component = self._components.get(component_num)
+            if component is None and component_num in self._lazy_components:
+                _, component_cls, args = self._lazy_components[component_num]
+                component = component_cls(self._lutron, self, *args)
+                self._components[component_num] = component
+        return component
+
+    def _materialize_components(self):
+        """Builds all the lazily added components, preserving XML order."""
+        if self._lazy_components is None:
+            return
+        with self._lutron._lazy_lock:
+            if self._lazy_components is None:
+                return
+            for component_num, (component_type, component_cls, args) in list(
+                self._lazy_components.items()
+            ):
+                component = self._components.get(component_num)
+                if component is None:
+                    component = component_cls(self._lutron, self, *args)
+                if component_type == "BUTTON":
+                    self.add_button(component)
+                else:
+                    self.add_led(component)
+            self._lazy_components = None
+
     @property
     def id(self):
         """The integration id"""
@@ -57,12 +183,66 @@ class Keypad(LutronEntity):
     @property
     def buttons(self):
         """Return a tuple of buttons for this keypad."""
-        return tuple(button for button in self._buttons)
+        if self._buttons_view is None:
+            self._materialize_components()
+            self._buttons_view = tuple(self._buttons)
+        return self._buttons_view
 
     @property
     def leds(self):
         """Return a tuple of leds for this keypad."""
-        return tuple(led for led in self._leds)
+        if self._leds_view is None:
+            self._materialize_components()
+            self._leds_view = tuple(self._leds)
+        return self._leds_view
+
+    @property
+    def led_states(self):
+        """Returns the cached state of all the LEDs as a bitmask, where bit n is
+        the state of the LED with number n."""
+        return self._led_states
+
+    def _led_state(self, led_num):
+        return bool(self._led_states >> led_num & 1)
+
+    def _set_led_state(self, led_num, state, reported=False):
+        """Updates the cached state of an LED. reported is True if the state was
+        reported by the repeater, which counts towards LED syncs in progress."""
+        bit = 1 << led_num
+        with _LED_SYNC_LOCK:
+            if state:
+                self._led_states |= bit
+            else:
+                self._led_states &= ~bit
+            if not reported:
+                return
+            for sync in self._led_syncs or ():
+                mask = sync.pending[self]
+                if mask & bit:
+                    sync.pending[self] = mask & ~bit
+                    sync.remaining -= 1
+                    if not sync.remaining:
+                        sync.event.set()
+
+    def sync_leds(self, timeout=1.0):
+        """Queries the state of all the LEDs of this keypad in one batch and
+        waits (up to timeout seconds) for all of them to report. Returns True if
+        they all did; led_states then holds their current state."""
+        return _sync_leds(self._lutron, (self,), timeout)
+
+    def _set_components(self, buttons, leds):
+        """Replaces all the components of this keypad (used on reload)."""
+        self._buttons = list(buttons)
+        self._leds = list(leds)
+        self._buttons_view = None
+        self._leds_view = None
+        self._lazy_components = None
+        self._components = {}
+        for component in self._buttons + self._leds:
+            component._keypad = self
+            # The encoded commands embed the keypad id.
+            component._templates = None
+            self._components[component.component_number] = component
 
     def handle_update(self, args):
         """The callback invoked by the main event loop if there's an event from this keypad."""
@@ -73,6 +253,7 @@ class Keypad(LutronEntity):
             "Updating %d(%s): c=%d a=%d params=%s"
             % (self._integration_id, self._name, component, action, params)
         )
-        if component in self._components:
-            return self._components[component].handle_update(action, params)
+        obj = self._get_component(component)
+        if obj is not None:
+            return obj.handle_update(action, params)
         return False
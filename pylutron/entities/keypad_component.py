@@ -5,6 +5,10 @@ from pylutron.logger import _LOGGER
 class KeypadComponent(LutronEntity):
     """Base class for a keypad component such as a button, or an LED."""
 
+    __slots__ = ("_keypad", "_num", "_component_num")
+
+    _RELOAD_ATTRS = LutronEntity._RELOAD_ATTRS + ("_num", "_component_num")
+
     def __init__(self, lutron, keypad, name, num, component_num, uuid):
         """Initializes the base keypad component class."""
         super(KeypadComponent, self).__init__(lutron, name, uuid)
@@ -5,7 +5,6 @@ from pylutron.entities.keypad_component import KeypadComponent
 
 
 from pylutron.events import LutronEvent
-from pylutron.request_helper import _RequestHelper
 from pylutron.logger import _LOGGER
 
 
@@ -13,6 +12,9 @@ class Led(KeypadComponent):
     """This object represents a keypad LED that we can turn on/off and
     handle events for (led toggled by scenes)."""
 
+    # The LED state lives in the keypad's LED bitmask.
+    __slots__ = ()
+
     _ACTION_LED_STATE = 9
 
     class Event(LutronEvent):
@@ -28,8 +30,6 @@ class Led(KeypadComponent):
     def __init__(self, lutron, keypad, name, led_num, component_num, uuid):
         """Initializes the Keypad LED class."""
         super(Led, self).__init__(lutron, keypad, name, led_num, component_num, uuid)
-        self._state = False
-        self._query_waiters = _RequestHelper()
 
     def __str__(self):
         """Pretty printed string value of the Led object."""
@@ -53,7 +53,12 @@ class Led(KeypadComponent):
 
     def __do_query_state(self):
         """Helper to perform the actual query for the current LED state."""
-        self._lutron.send(
+        self._lutron.send_raw(self._query_command())
+
+    def _query_command(self):
+        """Returns the encoded query for the state of this LED."""
+        return self._command(
+            "query_state",
             # Lutron.OP_QUERY,
             self._lutron.OP_QUERY,
             Keypad._CMD_TYPE,
@@ -65,14 +70,14 @@ class Led(KeypadComponent):
     @property
     def last_state(self):
         """Returns last cached value of the LED state, no query is performed."""
-        return self._state
+        return self._keypad._led_state(self.number)
 
     @property
     def state(self):
-        """Returns the current LED state by querying the remote controller."""
-        ev = self._query_waiters.request(self.__do_query_state)
-        ev.wait(1.0)
-        return self._state
+        """Returns the current LED state. Only the first read queries the remote
+        controller, monitoring keeps it up to date afterwards."""
+        self._fresh_state(self.__do_query_state)
+        return self.last_state
 
     @state.setter
     def state(self, new_state: bool):
@@ -80,16 +85,21 @@ class Led(KeypadComponent):
 
         new_state: bool
         """
-        self._lutron.send(
+        self._lutron.send_raw(self._state_command(new_state))
+        self._keypad._set_led_state(self.number, new_state)
+
+    def _state_command(self, new_state):
+        """Returns the encoded command that turns this LED on or off."""
+        prefix = self._command_prefix(
+            "set_state",
             # Lutron.OP_EXECUTE,
             self._lutron.OP_EXECUTE,
             Keypad._CMD_TYPE,
             self._keypad.id,
             self.component_number,
             Led._ACTION_LED_STATE,
-            int(new_state),
         )
-        self._state = new_state
+        return prefix + (b"1\r\n" if new_state else b"0\r\n")
 
     def handle_update(self, action, params):
         """Handle the specified action on this component."""
@@ -109,7 +119,8 @@ class Led(KeypadComponent):
                 % (params, action, self.number, self._keypad.name)
             )
             return False
-        self._state = bool(params[0])
-        self._query_waiters.notify()
-        self._dispatch_event(Led.Event.STATE_CHANGED, {"state": self._state})
+        state = bool(params[0])
+        self._keypad._set_led_state(self.number, state, reported=True)
+        self._notify_query_waiters()
+        self._dispatch_event(Led.Event.STATE_CHANGED, {"state": state})
         return True
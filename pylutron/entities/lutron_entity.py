@@ -1,18 +1,56 @@
+import threading
+import time
 from typing import Dict
 
 from pylutron.events import LutronEvent, LutronEventHandler
+from pylutron.logger import _LOGGER
+from pylutron.request_helper import _RequestHelper
+
+# Guards the on-demand creation of the per-entity _RequestHelper.
+_QUERY_WAITERS_LOCK = threading.Lock()
 
 
 class LutronEntity(object):
     """Base class for all the Lutron objects we'd like to manage. Just holds basic
-    common info we'd rather not manage repeatedly."""
+    common info we'd rather not manage repeatedly.
+
+    Entities use __slots__ and only create their subscriber list and request
+    helper when they're first needed, since large projects have many thousands
+    of them and most are never subscribed to or queried.
+
+    Cached state follows a common freshness policy, see _STATE_TTL and
+    _fresh_state()."""
+
+    __slots__ = (
+        "_lutron",
+        "_name",
+        "_subscribers",
+        "_uuid",
+        "_query_waiters",
+        "_templates",
+        "_state_time",
+    )
+
+    # Attributes compared and copied over when the XML db is reloaded. Subclasses
+    # extend this with the attributes they parse from the XML.
+    _RELOAD_ATTRS = ("_name", "_uuid")
+
+    # Seconds after which the cached state is stale and the next read triggers
+    # a background query. None means it never goes stale while connected,
+    # for state the repeater pushes to us through monitoring.
+    _STATE_TTL = None
 
     def __init__(self, lutron, name, uuid):
         """Initializes the base class with common, basic data."""
         self._lutron = lutron
         self._name = name
-        self._subscribers = []
+        self._subscribers = None
         self._uuid = uuid
+        self._query_waiters = None
+        # key -> encoded command, see _command().
+        self._templates = None
+        # time.monotonic() of the last state report, None if never received.
+        self._state_time = None
 
     @property
     def name(self):
@@ -24,9 +62,121 @@ class LutronEntity(object):
         return self._uuid
 
     def _dispatch_event(self, event: LutronEvent, params: Dict):
-        """Dispatches the specified event to all the subscribers."""
+        """Dispatches the specified event to the rule engine, if enabled, to
+        the batch subscriptions and to all the subscribers. A subscriber raising
+        an exception is logged and doesn't prevent the others from being
+        called."""
+        lutron = self._lutron
+        lutron._metrics.events_dispatched += 1
+        tracer = lutron._tracer
+        rules = lutron._rules
+        if rules is not None:
+            if tracer is None:
+                rules._on_event(self, event, params)
+            else:
+                start = time.perf_counter()
+                rules._on_event(self, event, params)
+                tracer.stage("rules", time.perf_counter() - start)
+        batches = lutron._batch_subscriptions
+        if batches:
+            for subscription in batches:
+                subscription._add(self, event, params)
+        if self._subscribers is None:
+            return
+        if tracer is not None:
+            self._dispatch_traced(tracer, event, params)
+            return
+        for handler, context in self._subscribers:
+            try:
+                handler(self, context, event, params)
+            except Exception:
+                lutron._metrics.handler_errors += 1
+                _LOGGER.exception("Error in %s handler for %s" % (event, self._name))
+
+    def _dispatch_traced(self, tracer, event, params):
+        """_dispatch_event() to the subscribers, timing each of them."""
+        dispatch_start = time.perf_counter()
         for handler, context in self._subscribers:
-            handler(self, context, event, params)
+            start = time.perf_counter()
+            try:
+                handler(self, context, event, params)
+            except Exception:
+                self._lutron._metrics.handler_errors += 1
+                _LOGGER.exception("Error in %s handler for %s" % (event, self._name))
+            tracer.handler(self, event, handler, time.perf_counter() - start)
+        tracer.stage("dispatch", time.perf_counter() - dispatch_start)
+
+    def _request_query(self, action):
+        """Requests action (a query) through this entity's _RequestHelper and
+        returns the threading.Event to wait on."""
+        waiters = self._query_waiters
+        if waiters is None:
+            with _QUERY_WAITERS_LOCK:
+                if self._query_waiters is None:
+                    self._query_waiters = _RequestHelper()
+                waiters = self._query_waiters
+        return waiters.request(action)
+
+    @classmethod
+    def set_state_ttl(cls, ttl):
+        """Sets how many seconds the cached state of entities of this type stays
+        fresh (None: until reconnected, for state kept fresh by monitoring)."""
+        cls._STATE_TTL = ttl
+
+    def _fresh_state(self, query, timeout=1.0):
+        """Applies the freshness policy before a state read. If the state was
+        never received, runs query and waits up to timeout seconds for the
+        reply. If it is stale (older than _STATE_TTL, or from before the last
+        reconnect), runs query without waiting: the caller gets the cached value
+        and the reply updates it in the background."""
+        if self._state_time is None:
+            self._request_query(query).wait(timeout)
+        elif not self._has_fresh_state():
+            self._request_query(query)
+
+    def _has_fresh_state(self):
+        """Returns whether the cached state was reported by the repeater and
+        isn't stale yet."""
+        state_time = self._state_time
+        if state_time is None or state_time < self._lutron._state_epoch:
+            return False
+        ttl = self._STATE_TTL
+        return ttl is None or time.monotonic() - state_time <= ttl
+
+    def _notify_query_waiters(self):
+        """Records that fresh state was received and wakes up everyone waiting
+        for a query response on this entity."""
+        self._state_time = time.monotonic()
+        if self._query_waiters is not None:
+            self._query_waiters.notify()
+
+    def _command(self, key, op, cmd, integration_id, *args):
+        """Returns the ASCII encoded command line (CRLF terminated) for
+        op cmd,integration_id,args. It is built on first use and cached under
+        key, so args must not vary between calls with the same key."""
+        templates = self._templates
+        if templates is not None:
+            command = templates.get(key)
+            if command is not None:
+                return command
+        return self._encode_command(key, b"\r\n", op, cmd, integration_id, args)
+
+    def _command_prefix(self, key, op, cmd, integration_id, *args):
+        """Like _command(), but returns the command up to and including the
+        comma that precedes the variable value, which the caller appends."""
+        templates = self._templates
+        if templates is not None:
+            command = templates.get(key)
+            if command is not None:
+                return command
+        return self._encode_command(key, b",", op, cmd, integration_id, args)
+
+    def _encode_command(self, key, suffix, op, cmd, integration_id, args):
+        if self._templates is None:
+            self._templates = {}
+        command = self._lutron._format(op, cmd, integration_id, *args)
+        command = self._templates[key] = command.encode("ascii") + suffix
+        return command
 
     def subscribe(self, handler: LutronEventHandler, context):
         """Subscribes to events from this entity.
@@ -39,8 +189,33 @@ class LutronEntity(object):
 
         context: User-supplied, opaque object that will be passed to handler.
         """
+        if self._subscribers is None:
+            self._subscribers = []
         self._subscribers.append((handler, context))
 
+    def unsubscribe(self, handler, context):
+        """Removes a subscription made with subscribe(handler, context)."""
+        if self._subscribers is None:
+            return
+        # Replaced rather than modified, in case it's being dispatched to.
+        subscribers = [s for s in self._subscribers if s != (handler, context)]
+        self._subscribers = subscribers or None
+
+    def _update_from(self, other):
+        """Copies the XML-derived attributes from other, a freshly parsed copy of
+        this entity, keeping runtime state (subscribers, cached state) intact.
+
+        Returns True if anything changed."""
+        changed = False
+        for attr in self._RELOAD_ATTRS:
+            value = getattr(other, attr)
+            if getattr(self, attr) != value:
+                setattr(self, attr, value)
+                changed = True
+        if changed:
+            self._templates = None
+        return changed
+
     def handle_update(self, args):
         """The handle_update callback is invoked when an event is received
         for the this entity.
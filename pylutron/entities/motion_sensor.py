@@ -4,7 +4,6 @@ import time
 from pylutron.entities.lutron_entity import LutronEntity
 from pylutron.events import LutronEvent
 from pylutron.lutron_enum import BatteryStatus, PowerSource
-from pylutron.request_helper import _RequestHelper
 
 from pylutron.logger import _LOGGER
 
@@ -16,9 +15,15 @@ class MotionSensor(LutronEntity):
     use area.occupancy_group.
     """
 
+    __slots__ = ("_integration_id", "_battery", "_power")
+
     _CMD_TYPE = "DEVICE"
 
     _ACTION_BATTERY_STATUS = 22
+    _RELOAD_ATTRS = LutronEntity._RELOAD_ATTRS + ("_integration_id",)
+    # Battery status won't change frequently but can't be retrieved for
+    # MONITORING, so it is refreshed at most once an hour.
+    _STATE_TTL = 3600.0
 
     class Event(LutronEvent):
         """MotionSensor events that can be generated.
@@ -39,8 +44,6 @@ class MotionSensor(LutronEntity):
         self._battery = None
         self._power = None
         self._lutron.register_id(MotionSensor._CMD_TYPE, self)
-        self._query_waiters = _RequestHelper()
-        self._last_update = None
 
     @property
     def id(self):
@@ -66,20 +69,22 @@ class MotionSensor(LutronEntity):
 
     @property
     def _update_age(self):
-        """Returns the time of the last poll in seconds."""
-        if self._last_update is None:
+        """Returns the time since the last status update in seconds."""
+        if self._state_time is None:
             return 1e6
         else:
-            return time.time() - self._last_update
+            return time.monotonic() - self._state_time
 
     @property
     def battery_status(self):
-        """Returns the current BatteryStatus."""
-        # Battery status won't change frequently but can't be retrieved for MONITORING.
-        # So rate limit queries to once an hour.
-        if self._update_age > 3600.0:
-            ev = self._query_waiters.request(self._do_query_battery)
-            ev.wait(1.0)
+        """Returns the current BatteryStatus.
+
+        With Lutron.start_battery_polling() this is always the cached value,
+        refreshed in the background. Otherwise the first read queries and
+        blocks, and later ones refresh a value older than _STATE_TTL in the
+        background."""
+        if self._lutron._battery_poller is None:
+            self._fresh_state(self._do_query_battery)
         return self._battery
 
     @property
@@ -91,13 +96,16 @@ class MotionSensor(LutronEntity):
     def _do_query_battery(self):
         """Helper to perform the query for the current BatteryStatus."""
         component_num = 1  # doesn't seem to matter
-        return self._lutron.send(
-            # Lutron.OP_QUERY,
-            self._lutron.OP_QUERY,
-            MotionSensor._CMD_TYPE,
-            self._integration_id,
-            component_num,
-            MotionSensor._ACTION_BATTERY_STATUS,
+        return self._lutron.send_raw(
+            self._command(
+                "query_battery",
+                # Lutron.OP_QUERY,
+                self._lutron.OP_QUERY,
+                MotionSensor._CMD_TYPE,
+                self._integration_id,
+                component_num,
+                MotionSensor._ACTION_BATTERY_STATUS,
+            )
         )
 
     def handle_update(self, args):
@@ -114,8 +122,7 @@ class MotionSensor(LutronEntity):
             return False
         self._power = PowerSource(int(power))
         self._battery = BatteryStatus(int(battery))
-        self._last_update = time.time()
-        self._query_waiters.notify()
+        self._notify_query_waiters()
         self._dispatch_event(
             MotionSensor.Event.STATUS_CHANGED,
             {"power": self._power, "battery": self._battery},
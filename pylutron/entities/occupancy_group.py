@@ -3,14 +3,16 @@ from enum import Enum
 # from pylutron.lutron import Lutron
 from pylutron.entities.lutron_entity import LutronEntity
 from pylutron.events import LutronEvent
-from pylutron.request_helper import _RequestHelper
 
 
 class OccupancyGroup(LutronEntity):
     """Represents one or more occupancy/vacancy sensors grouped into an Area."""
 
+    __slots__ = ("_area", "_group_number", "_integration_id", "_state")
+
     _CMD_TYPE = "GROUP"
     _ACTION_STATE = 3
+    _RELOAD_ATTRS = LutronEntity._RELOAD_ATTRS + ("_group_number", "_integration_id")
 
     class State(Enum):
         """Possible states of an OccupancyGroup."""
@@ -34,7 +36,6 @@ class OccupancyGroup(LutronEntity):
         self._group_number = group_number
         self._integration_id = None
         self._state = None
-        self._query_waiters = _RequestHelper()
 
     def _bind_area(self, area):
         self._area = area
@@ -58,11 +59,9 @@ class OccupancyGroup(LutronEntity):
 
     @property
     def state(self):
-        """Returns the current occupancy state."""
-        # Poll for the first request.
-        if self._state == None:
-            ev = self._query_waiters.request(self._do_query_state)
-            ev.wait(1.0)
+        """Returns the current occupancy state. Only the first read queries the
+        controller, monitoring keeps it up to date afterwards."""
+        self._fresh_state(self._do_query_state)
         return self._state
 
     def __str__(self):
@@ -77,12 +76,15 @@ class OccupancyGroup(LutronEntity):
 
     def _do_query_state(self):
         """Helper to perform the actual query for the current OccupancyGroup state."""
-        return self._lutron.send(
-            # Lutron.OP_QUERY,
-            self._lutron.OP_QUERY,
-            OccupancyGroup._CMD_TYPE,
-            self._integration_id,
-            OccupancyGroup._ACTION_STATE,
+        return self._lutron.send_raw(
+            self._command(
+                "query_state",
+                # Lutron.OP_QUERY,
+                self._lutron.OP_QUERY,
+                OccupancyGroup._CMD_TYPE,
+                self._integration_id,
+                OccupancyGroup._ACTION_STATE,
+            )
         )
 
     def handle_update(self, args):
@@ -94,6 +96,6 @@ class OccupancyGroup(LutronEntity):
             self._state = OccupancyGroup.State(int(args[1]))
         except ValueError:
             self._state = OccupancyGroup.State.UNKNOWN
-        self._query_waiters.notify()
+        self._notify_query_waiters()
         self._dispatch_event(OccupancyGroup.Event.OCCUPANCY, {"state": self._state})
         return True
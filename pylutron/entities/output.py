@@ -1,17 +1,24 @@
 from pylutron.entities import LutronEntity
 from pylutron.events import LutronEvent
+from pylutron.fade import _LevelTransition, _encode_fade
 
 # from pylutron.lutron import Lutron
 from pylutron.logger import _LOGGER
-from pylutron.request_helper import _RequestHelper
 
 
 class Output(LutronEntity):
     """This is the output entity in Lutron universe. This generally refers to a
     switched/dimmed load, e.g. light fixture, outlet, etc."""
 
+    __slots__ = ("_watts", "_output_type", "_level", "_integration_id", "_transition")
+
     _CMD_TYPE = "OUTPUT"
     _ACTION_ZONE_LEVEL = 1
+    _RELOAD_ATTRS = LutronEntity._RELOAD_ATTRS + (
+        "_watts",
+        "_output_type",
+        "_integration_id",
+    )
 
     class Event(LutronEvent):
         """Output events that can be generated.
@@ -29,7 +36,8 @@ class Output(LutronEntity):
         self._watts = watts
         self._output_type = output_type
         self._level = 0.0
-        self._query_waiters = _RequestHelper()
+        # Set while a fade (or delayed change) we requested is in progress.
+        self._transition = None
         self._integration_id = integration_id
 
         self._lutron.register_id(Output._CMD_TYPE, self)
@@ -70,59 +78,118 @@ class Output(LutronEntity):
             "Updating %d(%s): s=%d l=%f"
             % (self._integration_id, self._name, state, level)
         )
+        tracker = self._lutron._write_tracker
+        if tracker is not None:
+            tracker._handle_echo(self, level)
+        transition = self._transition
+        if transition is not None:
+            if abs(level - transition.target) < 0.01:
+                # Echo of the target at the start of our fade, keep estimating.
+                pass
+            elif not transition.done() and transition.is_between(level):
+                # Reported mid-fade, follow the rest of the fade from here.
+                transition.reanchor(level)
+                level = transition.target
+            else:
+                # Someone else changed the level.
+                self._transition = None
         self._level = level
-        self._query_waiters.notify()
+        self._notify_query_waiters()
         self._dispatch_event(Output.Event.LEVEL_CHANGED, {"level": self._level})
         return True
 
     def __do_query_level(self):
         """Helper to perform the actual query the current dimmer level of the
         output. For pure on/off loads the result is either 0.0 or 100.0."""
-        self._lutron.send(
-            # Lutron.OP_QUERY,
-            self._lutron.OP_QUERY,
-            Output._CMD_TYPE,
-            self._integration_id,
-            Output._ACTION_ZONE_LEVEL,
+        self._lutron.send_raw(
+            self._command(
+                "query_level",
+                # Lutron.OP_QUERY,
+                self._lutron.OP_QUERY,
+                Output._CMD_TYPE,
+                self._integration_id,
+                Output._ACTION_ZONE_LEVEL,
+            )
         )
 
     def last_level(self):
-        """Returns last cached value of the output level, no query is performed."""
+        """Returns last cached value of the output level, no query is performed.
+
+        While a fade requested through set_level() is in progress, this is the
+        estimated level at this moment."""
+        transition = self._transition
+        if transition is not None:
+            if not transition.done():
+                return transition.level_at()
+            self._transition = None
         return self._level
 
     @property
-    def level(self):
-        """Returns the current output level by querying the remote controller."""
-        ev = self._query_waiters.request(self.__do_query_level)
-        ev.wait(1.0)
+    def target_level(self):
+        """Returns the level the output is at, or fading to."""
         return self._level
 
+    @property
+    def pending_level(self):
+        """Returns the level of a write still waiting for the repeater to confirm
+        it (see Lutron.enable_confirmed_writes()), or None."""
+        tracker = self._lutron._write_tracker
+        return tracker.pending_level(self) if tracker is not None else None
+
+    @property
+    def level(self):
+        """Returns the current output level. Only the first read queries the
+        remote controller, monitoring keeps it up to date afterwards."""
+        self._fresh_state(self.__do_query_level)
+        return self.last_level()
+
     @level.setter
     def level(self, new_level):
         """Sets the new output level."""
-        if self._level == new_level:
+        if self._level == new_level and self.pending_level is None:
             return
-        self._lutron.send(
+        self.set_level(new_level)
+
+    def set_level(self, new_level, fade_time=None, delay=None):
+        """Sets the new output level, optionally fading over fade_time seconds
+        after waiting delay seconds. last_level() estimates the level while the
+        fade is in progress.
+
+        With confirmed writes enabled, the cached level only changes once the
+        repeater confirms the new level."""
+        command = self._level_command(new_level, fade_time, delay)
+        tracker = self._lutron._write_tracker
+        if tracker is not None:
+            tracker._track(self, new_level, fade_time, delay, command)
+            self._lutron.send_raw(command)
+            return
+        self._lutron.send_raw(command)
+        self._apply_level(new_level, fade_time, delay)
+
+    def _level_command(self, new_level, fade_time=None, delay=None):
+        """Returns the encoded command that sets the level of this output."""
+        prefix = self._command_prefix(
+            "set_level",
             # Lutron.OP_EXECUTE,
             self._lutron.OP_EXECUTE,
             Output._CMD_TYPE,
             self._integration_id,
             Output._ACTION_ZONE_LEVEL,
-            "%.2f" % new_level,
         )
+        if fade_time is None and not delay:
+            return prefix + b"%.2f\r\n" % new_level
+        return prefix + b"%.2f" % new_level + _encode_fade(fade_time, delay) + b"\r\n"
+
+    def _apply_level(self, new_level, fade_time=None, delay=None):
+        """Updates the cached level after a level command has been sent."""
+        if fade_time or delay:
+            self._transition = _LevelTransition(
+                self.last_level(), new_level, fade_time, delay
+            )
+        else:
+            self._transition = None
         self._level = new_level
 
-    # At some later date, we may want to also specify fade and delay times
-    # def set_level(self, new_level, fade_time, delay):
-    #     self._lutron.send(
-    #         Lutron.OP_EXECUTE,
-    #         Output._CMD_TYPE,
-    #         Output._ACTION_ZONE_LEVEL,
-    #         new_level,
-    #         fade_time,
-    #         delay,
-    #     )
-
     @property
     def watts(self):
         """Returns the configured maximum wattage for this output (not an actual
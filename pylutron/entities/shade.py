@@ -4,38 +4,99 @@ from pylutron.entities.output import Output
 
 
 class Shade(Output):
-    """This is the output entity for shades in Lutron universe."""
+    """This is the output entity for shades in Lutron universe.
+
+    The level of a shade is its position (0 closed, 100 open). Shades move at a
+    fixed speed, so while a shade is moving last_level() estimates its position
+    from travel_time, the time a full open/close takes."""
+
+    __slots__ = ("_travel_time",)
 
     _ACTION_RAISE = 2
     _ACTION_LOWER = 3
     _ACTION_STOP = 4
+    _DEFAULT_TRAVEL_TIME = 30.0
+
+    def __init__(self, lutron, name, watts, output_type, integration_id, uuid):
+        """Initializes the Shade."""
+        super(Shade, self).__init__(
+            lutron, name, watts, output_type, integration_id, uuid
+        )
+        self._travel_time = Shade._DEFAULT_TRAVEL_TIME
+
+    @property
+    def travel_time(self):
+        """Seconds the shade takes to go from fully closed to fully open, used
+        to estimate its position while moving."""
+        return self._travel_time
+
+    @travel_time.setter
+    def travel_time(self, seconds):
+        """Sets the travel time measured for this shade."""
+        self._travel_time = float(seconds)
+
+    @property
+    def is_moving(self):
+        """Returns True while the shade is estimated to be moving."""
+        transition = self._transition
+        return transition is not None and not transition.done()
+
+    def _apply_level(self, new_level, fade_time=None, delay=None):
+        """Updates the cached position after a level command. The repeater
+        moves shades at their own speed, so the estimate uses travel_time unless
+        a fade time was requested."""
+        if fade_time is None:
+            fade_time = abs(new_level - self.last_level()) / 100.0 * self._travel_time
+        super(Shade, self)._apply_level(new_level, fade_time, delay)
+
+    def _start_moving(self, target):
+        """Starts estimating a raise/lower towards target (0 or 100)."""
+        self._apply_level(target)
+
+    def _stop_moving(self):
+        """Freezes the position estimate where the shade is now."""
+        level = self.last_level()
+        self._transition = None
+        self._level = level
 
     def start_raise(self):
         """Starts raising the shade."""
-        self._lutron.send(
-            # Lutron.OP_EXECUTE,
-            self._lutron.OP_EXECUTE,
-            Output._CMD_TYPE,
-            self._integration_id,
-            Output._ACTION_RAISE,
+        self._lutron.send_raw(
+            self._command(
+                "raise",
+                # Lutron.OP_EXECUTE,
+                self._lutron.OP_EXECUTE,
+                Output._CMD_TYPE,
+                self._integration_id,
+                Shade._ACTION_RAISE,
+            )
         )
+        self._start_moving(100.0)
 
     def start_lower(self):
         """Starts lowering the shade."""
-        self._lutron.send(
-            # Lutron.OP_EXECUTE,
-            self._lutron.OP_EXECUTE,
-            Output._CMD_TYPE,
-            self._integration_id,
-            Output._ACTION_LOWER,
+        self._lutron.send_raw(
+            self._command(
+                "lower",
+                # Lutron.OP_EXECUTE,
+                self._lutron.OP_EXECUTE,
+                Output._CMD_TYPE,
+                self._integration_id,
+                Shade._ACTION_LOWER,
+            )
         )
+        self._start_moving(0.0)
 
     def stop(self):
-        """Starts raising the shade."""
-        self._lutron.send(
-            # Lutron.OP_EXECUTE,
-            self._lutron.OP_EXECUTE,
-            Output._CMD_TYPE,
-            self._integration_id,
-            Output._ACTION_STOP,
+        """Stops the shade."""
+        self._lutron.send_raw(
+            self._command(
+                "stop",
+                # Lutron.OP_EXECUTE,
+                self._lutron.OP_EXECUTE,
+                Output._CMD_TYPE,
+                self._integration_id,
+                Shade._ACTION_STOP,
+            )
         )
+        self._stop_moving()
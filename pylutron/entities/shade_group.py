@@ -0,0 +1,147 @@
+from pylutron.entities.lutron_entity import LutronEntity
+from pylutron.events import LutronEvent
+from pylutron.fade import _encode_fade
+from pylutron.logger import _LOGGER
+
+
+class ShadeGroup(LutronEntity):
+    """A group of shades that the repeater moves together with a single
+    command, so that they start (and stop) in sync.
+
+    The member shades are regular Shade outputs; group commands also update
+    their position estimates."""
+
+    __slots__ = ("_shades", "_shades_view", "_integration_id", "_level")
+
+    _CMD_TYPE = "SHADEGRP"
+    _ACTION_ZONE_LEVEL = 1
+    _ACTION_RAISE = 2
+    _ACTION_LOWER = 3
+    _ACTION_STOP = 4
+    _RELOAD_ATTRS = LutronEntity._RELOAD_ATTRS + ("_integration_id",)
+
+    class Event(LutronEvent):
+        """ShadeGroup events that can be generated.
+
+        LEVEL_CHANGED: The group level has changed.
+            Params:
+              level: new group level (float)
+        """
+
+        LEVEL_CHANGED = 1
+
+    def __init__(self, lutron, name, integration_id, uuid):
+        """Initializes the ShadeGroup."""
+        super(ShadeGroup, self).__init__(lutron, name, uuid)
+        self._shades = []
+        self._shades_view = None
+        self._integration_id = integration_id
+        self._level = 0.0
+
+        self._lutron.register_id(ShadeGroup._CMD_TYPE, self)
+
+    def __str__(self):
+        """Returns a pretty-printed string for this object."""
+        return 'ShadeGroup name: "%s" id: %d shades: %d' % (
+            self._name,
+            self._integration_id,
+            len(self._shades),
+        )
+
+    def __repr__(self):
+        """Returns a stringified representation of this object."""
+        return str(
+            {
+                "name": self._name,
+                "id": self._integration_id,
+                "shades": [shade.id for shade in self._shades],
+            }
+        )
+
+    def add_shade(self, shade):
+        """Adds a member shade, only used during initial parsing."""
+        self._shades.append(shade)
+        self._shades_view = None
+
+    def _set_shades(self, shades):
+        """Replaces the member shades (used on reload)."""
+        self._shades = list(shades)
+        self._shades_view = None
+
+    @property
+    def id(self):
+        """The integration id"""
+        return self._integration_id
+
+    @property
+    def shades(self):
+        """Return the tuple of Shades in this group."""
+        if self._shades_view is None:
+            self._shades_view = tuple(self._shades)
+        return self._shades_view
+
+    def last_level(self):
+        """Returns the last level set on or reported by the group."""
+        return self._level
+
+    def handle_update(self, args):
+        """Handles an event update for this group."""
+        _LOGGER.debug("handle_update %d -- %s" % (self._integration_id, args))
+        action = int(args[0])
+        if action != ShadeGroup._ACTION_ZONE_LEVEL:
+            return False
+        self._level = float(args[1])
+        self._dispatch_event(ShadeGroup.Event.LEVEL_CHANGED, {"level": self._level})
+        return True
+
+    def set_level(self, new_level, fade_time=None, delay=None):
+        """Moves all the shades of the group to new_level with one command."""
+        self._lutron.send_raw(self._level_command(new_level, fade_time, delay))
+        self._apply_level(new_level, fade_time, delay)
+
+    def _level_command(self, new_level, fade_time=None, delay=None):
+        """Returns the encoded command that sets the level of this group."""
+        prefix = self._command_prefix(
+            "set_level",
+            self._lutron.OP_EXECUTE,
+            ShadeGroup._CMD_TYPE,
+            self._integration_id,
+            ShadeGroup._ACTION_ZONE_LEVEL,
+        )
+        return prefix + b"%.2f" % new_level + _encode_fade(fade_time, delay) + b"\r\n"
+
+    def _apply_level(self, new_level, fade_time=None, delay=None):
+        """Updates the cached group level and the member shade estimates after
+        a level command has been sent."""
+        self._level = new_level
+        for shade in self._shades:
+            shade._apply_level(new_level, fade_time, delay)
+
+    def start_raise(self):
+        """Starts raising all the shades of the group."""
+        self._send(ShadeGroup._ACTION_RAISE)
+        for shade in self._shades:
+            shade._start_moving(100.0)
+
+    def start_lower(self):
+        """Starts lowering all the shades of the group."""
+        self._send(ShadeGroup._ACTION_LOWER)
+        for shade in self._shades:
+            shade._start_moving(0.0)
+
+    def stop(self):
+        """Stops all the shades of the group."""
+        self._send(ShadeGroup._ACTION_STOP)
+        for shade in self._shades:
+            shade._stop_moving()
+
+    def _send(self, action):
+        self._lutron.send_raw(
+            self._command(
+                action,
+                self._lutron.OP_EXECUTE,
+                ShadeGroup._CMD_TYPE,
+                self._integration_id,
+                action,
+            )
+        )
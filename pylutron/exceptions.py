@@ -26,6 +26,26 @@ class InvalidSubscription(LutronException):
     pass
 
 
+class InvalidMacroStep(LutronException):
+    """Raised when a Macro step refers to an unknown entity or an invalid value."""
+
+    pass
+
+
+class InvalidRule(LutronException):
+    """Raised when a Rule has a trigger its entity can't generate or an invalid
+    action."""
+
+    pass
+
+
+class SharedStateError(LutronException):
+    """Raised when a shared state segment doesn't match the project topology or
+    can't be read consistently."""
+
+    pass
+
+
 _EXPECTED_NETWORK_EXCEPTIONS = (
     BrokenPipeError,
     # OSError: [Errno 101] Network unreachable
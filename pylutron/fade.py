@@ -0,0 +1,79 @@
+import time
+
+
+def _format_time(seconds):
+    """Formats a fade or delay time the way the controller expects it: SS.ss
+    below a minute, MM:SS below an hour and HH:MM:SS otherwise."""
+    if seconds < 60:
+        return "%.2f" % seconds
+    seconds = int(round(seconds))
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return "%d:%02d" % (minutes, seconds)
+    hours, minutes = divmod(minutes, 60)
+    return "%d:%02d:%02d" % (hours, minutes, seconds)
+
+
+def _encode_fade(fade_time, delay):
+    """Returns the encoded ",fade[,delay]" arguments of a level command, empty
+    if neither is given."""
+    if delay:
+        return ("," + _format_time(fade_time or 0) + "," + _format_time(delay)).encode(
+            "ascii"
+        )
+    if fade_time is not None:
+        return ("," + _format_time(fade_time)).encode("ascii")
+    return b""
+
+
+class _LevelTransition(object):
+    """Client-side model of an output fading from one level to another.
+
+    The controller only reports the target level when a fade starts, so we
+    estimate the level in between by linear interpolation: the level stays at
+    start_level until the delay has passed, then moves linearly to target over
+    fade_time seconds.
+    """
+
+    __slots__ = ("start_level", "target", "start", "duration")
+
+    def __init__(self, start_level, target, fade_time, delay, now=None):
+        if now is None:
+            now = time.monotonic()
+        self.start_level = start_level
+        self.target = target
+        self.start = now + (delay or 0.0)
+        self.duration = fade_time or 0.0
+
+    def level_at(self, now=None):
+        """Returns the estimated level at time now (time.monotonic())."""
+        if now is None:
+            now = time.monotonic()
+        if now <= self.start:
+            return self.start_level
+        if now >= self.start + self.duration:
+            return self.target
+        progress = (now - self.start) / self.duration
+        return self.start_level + (self.target - self.start_level) * progress
+
+    def done(self, now=None):
+        """Returns True once the level has reached the target."""
+        if now is None:
+            now = time.monotonic()
+        return now >= self.start + self.duration
+
+    def reanchor(self, level, now=None):
+        """Restarts the estimate from a level reported mid-fade, keeping the
+        time at which the target will be reached."""
+        if now is None:
+            now = time.monotonic()
+        end = self.start + self.duration
+        self.start_level = level
+        self.start = now
+        self.duration = max(end - now, 0.0)
+
+    def is_between(self, level, now=None):
+        """Returns True if level lies on the remaining path to the target."""
+        current = self.level_at(now)
+        low, high = sorted((current, self.target))
+        return low <= level <= high
@@ -0,0 +1,183 @@
+import threading
+
+from pylutron.entities.button import Button
+
+
+class _GestureState(object):
+    """Gesture tracking for one button that is held or was just tapped."""
+
+    __slots__ = ("held", "second_press", "long_pressed", "repeats", "timer")
+
+    def __init__(self):
+        self.held = False
+        self.second_press = False
+        self.long_pressed = False
+        self.repeats = 0
+        self.timer = None
+
+
+class GestureDetector(object):
+    """Turns the PRESSED/RELEASED events of buttons into gestures.
+
+    Enabled with Lutron.enable_button_gestures(). On top of PRESSED and
+    RELEASED, buttons then also emit:
+
+    TAP: pressed and released once, and not pressed again within
+         double_tap_window seconds.
+    DOUBLE_TAP: pressed again within double_tap_window seconds of a tap.
+    LONG_PRESS: held for long_press_time seconds.
+    HOLD_REPEAT: emitted every repeat_interval seconds while still held after
+                 a long press (at most until max_hold seconds), with the
+                 repeat count as the "count" param.
+
+    Not all buttons report RELEASED. Until a button has reported a release,
+    the detector doesn't know when it is let go, so each press of it emits TAP
+    right away and nothing else: no DOUBLE_TAP, LONG_PRESS or HOLD_REPEAT. Once
+    it has reported a release (or was declared with set_sends_release()), it
+    gets full gesture detection.
+
+    Thresholds apply to all buttons and can be overridden per button with
+    set_thresholds(). Only buttons in the middle of a gesture have any state,
+    and all their timers run on the Lutron scheduler thread.
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        double_tap_window=0.3,
+        long_press_time=0.8,
+        repeat_interval=0.25,
+        max_hold=30.0,
+    ):
+        self._scheduler = scheduler
+        self._defaults = {
+            "double_tap_window": double_tap_window,
+            "long_press_time": long_press_time,
+            "repeat_interval": repeat_interval,
+            "max_hold": max_hold,
+        }
+        self._overrides = {}
+        self._lock = threading.Lock()
+        self._states = {}
+        # Buttons known to report releases.
+        self._sends_release = set()
+
+    def set_sends_release(self, button, sends_release=True):
+        """Declares whether button reports RELEASED, instead of waiting for its
+        first release to find out."""
+        with self._lock:
+            if sends_release:
+                self._sends_release.add(button)
+            else:
+                self._sends_release.discard(button)
+
+    def set_thresholds(self, button=None, **thresholds):
+        """Changes the thresholds (double_tap_window, long_press_time,
+        repeat_interval, max_hold) of one button, or the defaults for all buttons
+        if button is None. A double_tap_window of 0 emits TAP right on release.
+        """
+        unknown = set(thresholds) - set(self._defaults)
+        if unknown:
+            raise ValueError("Unknown thresholds: %s" % ", ".join(sorted(unknown)))
+        if button is None:
+            self._defaults.update(thresholds)
+        else:
+            self._overrides.setdefault(button, {}).update(thresholds)
+
+    def _threshold(self, button, name):
+        overrides = self._overrides.get(button)
+        if overrides is not None and name in overrides:
+            return overrides[name]
+        return self._defaults[name]
+
+    def _on_press(self, button):
+        """Called by Button.handle_update on a press."""
+        with self._lock:
+            if button in self._sends_release:
+                self._start_press(button)
+                return
+        button._dispatch_event(Button.Event.TAP, {})
+
+    def _start_press(self, button):
+        """Starts tracking a press. Assumes self._lock is held."""
+        state = self._states.get(button)
+        if state is None:
+            state = self._states[button] = _GestureState()
+        elif state.timer is not None:
+            # Pressed again while waiting to emit TAP.
+            state.timer.cancel()
+            state.second_press = True
+        state.held = True
+        state.long_pressed = False
+        state.repeats = 0
+        state.timer = self._scheduler.call_later(
+            self._threshold(button, "long_press_time"),
+            self._on_long_press,
+            button,
+            state,
+        )
+
+    def _on_release(self, button):
+        """Called by Button.handle_update on a release."""
+        event = None
+        with self._lock:
+            self._sends_release.add(button)
+            state = self._states.get(button)
+            if state is None or not state.held:
+                return
+            state.timer.cancel()
+            state.timer = None
+            state.held = False
+            window = self._threshold(button, "double_tap_window")
+            if state.long_pressed:
+                del self._states[button]
+            elif state.second_press:
+                del self._states[button]
+                event = Button.Event.DOUBLE_TAP
+            elif not window:
+                del self._states[button]
+                event = Button.Event.TAP
+            else:
+                state.timer = self._scheduler.call_later(
+                    window, self._on_tap_timeout, button, state
+                )
+        if event is not None:
+            button._dispatch_event(event, {})
+
+    def _on_tap_timeout(self, button, state):
+        with self._lock:
+            if self._states.get(button) is not state or state.held:
+                return
+            del self._states[button]
+        button._dispatch_event(Button.Event.TAP, {})
+
+    def _on_long_press(self, button, state):
+        with self._lock:
+            if self._states.get(button) is not state or not state.held:
+                return
+            state.long_pressed = True
+            state.second_press = False
+            state.timer = self._scheduler.call_later(
+                self._threshold(button, "repeat_interval"),
+                self._on_repeat,
+                button,
+                state,
+            )
+        button._dispatch_event(Button.Event.LONG_PRESS, {})
+
+    def _on_repeat(self, button, state):
+        with self._lock:
+            if self._states.get(button) is not state or not state.held:
+                return
+            state.repeats += 1
+            count = state.repeats
+            interval = self._threshold(button, "repeat_interval")
+            held_for = self._threshold(button, "long_press_time") + count * interval
+            if held_for + interval <= self._threshold(button, "max_hold"):
+                state.timer = self._scheduler.call_later(
+                    interval, self._on_repeat, button, state
+                )
+            else:
+                # Held for max_hold, or the release was lost; give up.
+                del self._states[button]
+        button._dispatch_event(Button.Event.HOLD_REPEAT, {"count": count})
@@ -0,0 +1,318 @@
+import os
+import selectors
+import socket
+import threading
+
+from pylutron.logger import _LOGGER
+from pylutron.lutron import Lutron
+from pylutron.lutron_connection import LutronConnection
+
+_LOGIN_USER = 0
+_LOGIN_PASSWORD = 1
+_READY = 2
+
+
+class _HubClient(object):
+    __slots__ = ("sock", "state", "user", "inbuf", "outbuf", "name")
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.state = _LOGIN_USER
+        self.user = None
+        self.inbuf = bytearray()
+        # Broadcast data the client's socket hasn't accepted yet.
+        self.outbuf = bytearray()
+        self.name = name
+
+
+class LutronHub(object):
+    """Shares the repeater connection of a Lutron object with other processes.
+
+    The repeater accepts only a few integration sessions. The hub listens on a
+    Unix socket (path) or on TCP (host, port) and speaks the repeater's
+    protocol, so clients (see HubLutron) connect to it as they would to the
+    repeater: the hub re-broadcasts every ~ status line it receives to all the
+    clients, and forwards their # and ? commands to the repeater. Replies to
+    queries are broadcast like any other status line. The hub already enables
+    monitoring, so the clients' #MONITORING commands are dropped.
+
+    Status lines are broadcast once per read from the repeater, as a single
+    write per client. A client that doesn't keep up has its pending data
+    buffered; once more than max_client_buffer bytes are pending it is
+    disconnected (its HubLutron reconnects and re-reads stale state), so a slow
+    client never holds up the repeater connection or the other clients.
+
+    If user is given, clients must log in with user and password.
+
+    Started with Lutron.serve_hub(); call shutdown() to stop.
+    """
+
+    def __init__(
+        self,
+        lutron,
+        path=None,
+        host="127.0.0.1",
+        port=0,
+        user=None,
+        password=None,
+        max_client_buffer=1 << 20,
+    ):
+        self._lutron = lutron
+        self._user = user.encode("ascii") if user is not None else None
+        self._password = password.encode("ascii") if password is not None else None
+        self._max_client_buffer = max_client_buffer
+        self._path = path
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(path)
+        else:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((host, port))
+        self._server.listen(16)
+        self._server.setblocking(False)
+        self._lock = threading.Lock()
+        self._clients = {}
+        # Clients with buffered output or to disconnect, handled by the hub
+        # thread, which is woken up through _wakeup.
+        self._pending = set()
+        self._dropped = set()
+        self._wakeup_recv, self._wakeup = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._server, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ)
+        self._running = True
+        self.lines_broadcast = 0
+        self.commands_forwarded = 0
+        self.slow_clients_dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="pylutron-hub", daemon=True
+        )
+        self._thread.start()
+        lutron._conn._line_listeners += (self._broadcast,)
+
+    @property
+    def port(self):
+        """The TCP port the hub listens on (useful when started with port 0)."""
+        return None if self._path is not None else self._server.getsockname()[1]
+
+    @property
+    def clients(self):
+        """The number of clients that are logged in."""
+        with self._lock:
+            return sum(1 for c in self._clients.values() if c.state == _READY)
+
+    def shutdown(self):
+        """Disconnects all the clients and stops the hub."""
+        conn = self._lutron._conn
+        conn._line_listeners = tuple(
+            listener for listener in conn._line_listeners if listener != self._broadcast
+        )
+        self._running = False
+        self._wake()
+        self._thread.join()
+
+    def _wake(self):
+        try:
+            self._wakeup.send(b"\0")
+        except BlockingIOError:
+            pass
+
+    def _broadcast(self, lines):
+        """Called by the connection with the lines of one read."""
+        data = b"".join(
+            bytes(line.rstrip(b"\r")) + b"\r\n" for line in lines if line[:1] == b"~"
+        )
+        if not data:
+            return
+        wake = False
+        with self._lock:
+            self.lines_broadcast += data.count(b"\n")
+            for client in self._clients.values():
+                if client.state != _READY or client in self._dropped:
+                    continue
+                if not client.outbuf:
+                    try:
+                        sent = client.sock.send(data)
+                    except BlockingIOError:
+                        sent = 0
+                    except OSError:
+                        self._dropped.add(client)
+                        wake = True
+                        continue
+                    if sent == len(data):
+                        continue
+                    client.outbuf += memoryview(data)[sent:]
+                else:
+                    client.outbuf += data
+                if len(client.outbuf) > self._max_client_buffer:
+                    _LOGGER.warning("Dropping slow hub client %s" % client.name)
+                    self.slow_clients_dropped += 1
+                    self._dropped.add(client)
+                self._pending.add(client)
+                wake = True
+        if wake:
+            self._wake()
+
+    def _run(self):
+        while self._running:
+            for key, _ in self._selector.select():
+                sock = key.fileobj
+                if sock is self._server:
+                    self._accept()
+                elif sock is self._wakeup_recv:
+                    try:
+                        sock.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._service(self._clients.get(sock))
+            self._update_registrations()
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            self._close(client)
+        self._selector.close()
+        self._server.close()
+        self._wakeup.close()
+        self._wakeup_recv.close()
+        if self._path is not None and os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def _accept(self):
+        try:
+            sock, address = self._server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        client = _HubClient(sock, str(address) or "unix")
+        with self._lock:
+            self._clients[sock] = client
+        self._selector.register(sock, selectors.EVENT_READ)
+        self._send_direct(client, LutronConnection.USER_PROMPT)
+
+    def _send_direct(self, client, data):
+        """Sends a reply to a client that isn't receiving broadcasts yet."""
+        try:
+            client.sock.sendall(data)
+        except OSError:
+            with self._lock:
+                self._dropped.add(client)
+
+    def _update_registrations(self):
+        with self._lock:
+            dropped, self._dropped = self._dropped, set()
+            pending, self._pending = self._pending, set()
+        for client in dropped:
+            self._close(client)
+        for client in pending - dropped:
+            with self._lock:
+                # _service() may have drained it since it was marked pending.
+                if client.sock not in self._clients or not client.outbuf:
+                    continue
+            self._selector.modify(
+                client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE
+            )
+
+    def _close(self, client):
+        with self._lock:
+            if self._clients.pop(client.sock, None) is None:
+                return
+        self._selector.unregister(client.sock)
+        client.sock.close()
+
+    def _service(self, client):
+        if client is None:
+            return
+        with self._lock:
+            if client.outbuf:
+                try:
+                    sent = client.sock.send(client.outbuf)
+                    del client.outbuf[:sent]
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    self._dropped.add(client)
+                    return
+            if not client.outbuf:
+                self._selector.modify(client.sock, selectors.EVENT_READ)
+        try:
+            data = client.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(client)
+            return
+        client.inbuf += data
+        end = client.inbuf.rfind(b"\n")
+        if end < 0:
+            return
+        lines = client.inbuf[:end].split(b"\n")
+        del client.inbuf[: end + 1]
+        commands = []
+        for line in lines:
+            line = bytes(line.strip())
+            if client.state == _READY:
+                if line[:1] in (b"#", b"?") and not line.startswith(b"#MONITORING"):
+                    commands.append(line + b"\r\n")
+            else:
+                self._login(client, line)
+        if commands:
+            self.commands_forwarded += len(commands)
+            self._lutron.send_raw(b"".join(commands))
+
+    def _login(self, client, line):
+        if client.state == _LOGIN_USER:
+            client.user = line
+            client.state = _LOGIN_PASSWORD
+            self._send_direct(client, LutronConnection.PW_PROMPT)
+            return
+        if self._user is not None and (
+            client.user != self._user or line != self._password
+        ):
+            _LOGGER.warning("Hub client %s failed to log in" % client.name)
+            self._close(client)
+            return
+        with self._lock:
+            client.state = _READY
+        self._send_direct(client, b"\r\n" + LutronConnection.PROMPT)
+
+
+class HubLutron(Lutron):
+    """A Lutron object that connects to a LutronHub instead of the repeater.
+
+    It is used like Lutron: load_xml_db() still fetches the project from the
+    repeater (HTTP isn't limited like integration sessions are) or from the
+    cache, connect() connects to the hub.
+
+    path: the hub's Unix socket; otherwise the hub is at host:port.
+    repeater_host: the repeater to fetch the XML db from.
+    """
+
+    def __init__(
+        self,
+        repeater_host,
+        path=None,
+        host="127.0.0.1",
+        port=None,
+        user="lutron",
+        password="integration",
+        coalesce_interval=None,
+    ):
+        if path is None and port is None:
+            raise ValueError("Either the hub's path or port is required")
+        Lutron.__init__(
+            self,
+            path if path is not None else host,
+            user,
+            password,
+            coalesce_interval=coalesce_interval,
+            port=port,
+        )
+        self._host = repeater_host
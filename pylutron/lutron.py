@@ -1,7 +1,20 @@
+import threading
+import time
+
 from pylutron.lutron_connection import LutronConnection
 from pylutron.entities.lutron_entity import LutronEntity
+from pylutron.batch import BatchSubscription
+from pylutron.battery_poller import BatteryPoller
 from pylutron.exceptions import InvalidSubscription, IntegrationIdExistsError
 from pylutron.logger import _LOGGER
+from pylutron.gestures import GestureDetector
+from pylutron.metrics import Metrics, MetricsServer
+from pylutron.registry import EntityRegistry
+from pylutron.rules import RuleEngine
+from pylutron.scheduler import _Scheduler
+from pylutron.write_tracker import WriteTracker
+from pylutron.xml_db_diff import _iter_entities, merge_areas
+from pylutron.xml_db_fetcher import XmlDbFetcher
 from pylutron.xml_parser import LutronXmlDbParser  # This causes circular imports
 
 
@@ -18,25 +31,162 @@ class Lutron(object):
     OP_QUERY = "?"
     OP_RESPONSE = "~"
 
-    def __init__(self, host, user, password):
+    def __init__(self, host, user, password, coalesce_interval=None, port=23):
         """Initializes the Lutron object. No connection is made to the remote
-        device."""
+        device.
+
+        port: the TCP port of the integration (telnet) interface.
+
+        coalesce_interval: if set, outgoing commands are written at most every
+            coalesce_interval seconds, and a level set on an output replaces a
+            still unsent level for that output (e.g. while dragging a slider).
+        """
         self._host = host
         self._user = user
         self._password = password
         self._name = None
-        self._conn = LutronConnection(host, user, password, self._recv)
+        self._metrics = Metrics()
+        self._conn = LutronConnection(
+            host,
+            user,
+            password,
+            self._recv,
+            coalesce_interval=coalesce_interval,
+            connect_callback=self._on_connect,
+            metrics=self._metrics,
+            port=port,
+            read_done_callback=self._on_read_done,
+        )
+        # time.monotonic() of the last (re)connect. Cached state received before
+        # it may have missed updates, see LutronEntity._fresh_state().
+        self._state_epoch = 0.0
         self._ids = {}
+        # cmd_type -> {integration_id: factory} for entities that are only built
+        # when their first event arrives (lazy parsing mode).
+        self._lazy_ids = {}
+        self._lazy_lock = threading.RLock()
+        # While reloading the XML db, newly parsed objects register here instead
+        # of in self._ids so that live dispatch is unaffected until the swap.
+        self._staged_ids = None
         self._legacy_subscribers = {}
         self._areas = []
         self._outputs = []
+        self._registry = EntityRegistry()
         self._guid = None
+        # Shared timer thread (started on first use) for retries, timeouts and
+        # delayed work.
+        self._scheduler = _Scheduler()
+        self._write_tracker = None
+        self._gestures = None
+        self._rules = None
+        self._tracer = None
+        # BatchSubscriptions; replaced, never modified, so dispatch can iterate
+        # without a lock.
+        self._batch_subscriptions = ()
+        self._battery_poller = None
 
     @property
     def areas(self):
         """Return the areas that were discovered for this Lutron controller."""
         return self._areas
 
+    @property
+    def write_tracker(self):
+        """Returns the WriteTracker if confirmed writes are enabled, or None."""
+        return self._write_tracker
+
+    def enable_confirmed_writes(self, timeout=2.0, max_attempts=3):
+        """Enables confirmed writes: output level commands stay pending until
+        the repeater echoes the new level, and are re-sent every timeout seconds
+        up to max_attempts times. Returns the WriteTracker, which reports the
+        latency and failures of each write."""
+        if self._write_tracker is None:
+            self._write_tracker = WriteTracker(
+                self, self._scheduler, timeout=timeout, max_attempts=max_attempts
+            )
+        return self._write_tracker
+
+    def enable_button_gestures(self, **thresholds):
+        """Makes buttons emit TAP, DOUBLE_TAP, LONG_PRESS and HOLD_REPEAT events.
+        Thresholds (double_tap_window, long_press_time, repeat_interval and
+        max_hold, in seconds) can be given here or changed later on the returned
+        GestureDetector."""
+        if self._gestures is None:
+            self._gestures = GestureDetector(self._scheduler)
+        if thresholds:
+            self._gestures.set_thresholds(**thresholds)
+        return self._gestures
+
+    def enable_rules(self):
+        """Returns the RuleEngine, creating it on first use. Rules added to it
+        run from the event dispatch path."""
+        if self._rules is None:
+            self._rules = RuleEngine()
+        return self._rules
+
+    def start_battery_polling(self, interval=3600.0, jitter=0.2):
+        """Starts refreshing the battery status of every MotionSensor in the
+        background, spread evenly over interval seconds. Returns the
+        BatteryPoller."""
+        if self._battery_poller is None:
+            self._battery_poller = BatteryPoller(
+                self, self._scheduler, interval=interval, jitter=jitter
+            )
+        self._battery_poller.start()
+        return self._battery_poller
+
+    def stop_battery_polling(self):
+        """Stops the background battery polling; MotionSensor reads query the
+        repeater on demand again."""
+        if self._battery_poller is not None:
+            self._battery_poller.stop()
+            self._battery_poller = None
+
+    def set_tracer(self, tracer):
+        """Installs a Tracer (e.g. a ProfilingTracer) that receives the timing
+        of each receive/dispatch stage and of each subscriber call. None
+        removes it; nothing is timed then."""
+        self._tracer = tracer
+        self._conn._tracer = tracer
+
+    @property
+    def metrics(self):
+        """Returns the Metrics of this Lutron object and its connection."""
+        return self._metrics
+
+    def serve_metrics(self, port=9464, host="127.0.0.1"):
+        """Serves the metrics in the Prometheus text format on
+        http://host:port/metrics from a background thread. Returns the
+        MetricsServer; call shutdown() on it to stop."""
+        return MetricsServer(self._metrics, host=host, port=port)
+
+    def serve_hub(self, path=None, host="127.0.0.1", port=0, **kwargs):
+        """Shares this object's repeater connection with other processes, which
+        connect with HubLutron to the Unix socket path or to host:port. See
+        LutronHub for the other arguments. Returns the LutronHub; call
+        shutdown() on it to stop."""
+        from pylutron.hub import LutronHub
+
+        return LutronHub(self, path=path, host=host, port=port, **kwargs)
+
+    def publish_state(self, name=None):
+        """Publishes output levels and occupancy states into a shared memory
+        segment, which other processes read with SharedStateReader. Returns the
+        SharedStatePublisher; its name identifies the segment."""
+        from pylutron.shared_state import SharedStatePublisher
+
+        return SharedStatePublisher(self, name=name)
+
+    @property
+    def registry(self):
+        """Returns the EntityRegistry indexing all the discovered entities."""
+        return self._registry
+
+    @property
+    def root_areas(self):
+        """Return the top-level areas; nested areas are reachable via children."""
+        return [area for area in self._areas if area.parent is None]
+
     @property
     def outputs(self):
         """Returns all outputs discovered for this Lutron controller."""
@@ -44,8 +194,40 @@ class Lutron(object):
 
     def all_off(self):
         """Turn off all outputs"""
-        for output in self._outputs:
-            output.level = 0
+        self.set_levels(self._outputs, 0)
+
+    def set_levels(self, outputs, new_level, fade_time=None, delay=None):
+        """Sets the level of several outputs, optionally with a fade and delay,
+        sending all the commands to the controller in a single write.
+
+        Without a fade or delay, outputs known to be at new_level already (from
+        a fresh report, or a confirmed write to new_level still pending) are
+        skipped; any other output gets the command, as with Output.set_level()."""
+        tracker = self._write_tracker
+        if fade_time is None and not delay:
+            outputs = [
+                output
+                for output in outputs
+                if not self._known_at_level(output, new_level, tracker)
+            ]
+        commands = [
+            output._level_command(new_level, fade_time, delay) for output in outputs
+        ]
+        if tracker is not None:
+            for output, command in zip(outputs, commands):
+                tracker._track(output, new_level, fade_time, delay, command)
+            self.send_raw(b"".join(commands))
+            return
+        self.send_raw(b"".join(commands))
+        for output in outputs:
+            output._apply_level(new_level, fade_time, delay)
+
+    @staticmethod
+    def _known_at_level(output, new_level, tracker):
+        pending = tracker.pending_level(output) if tracker is not None else None
+        if pending is not None:
+            return pending == new_level
+        return output._level == new_level and output._has_fresh_state()
 
     def set_guid(self, guid):
         self._guid = guid
@@ -76,14 +258,54 @@ class Lutron(object):
             self._legacy_subscribers[obj] = handler
             obj.subscribe(self._dispatch_legacy_subscriber, None)
 
+    def subscribe_batch(self, handler, entities=None, window=None):
+        """Subscribes handler to the events of entities (all of them if None),
+        delivered in batches as lists of (entity, event, params) tuples: one
+        batch per read from the controller, or, if window is given, per window
+        seconds. Returns the BatchSubscription."""
+        subscription = BatchSubscription(self, handler, entities, window)
+        self._batch_subscriptions += (subscription,)
+        return subscription
+
+    def _remove_batch_subscription(self, subscription):
+        self._batch_subscriptions = tuple(
+            s for s in self._batch_subscriptions if s is not subscription
+        )
+
+    def _on_read_done(self):
+        """Invoked by the connection manager after each read's lines."""
+        for subscription in self._batch_subscriptions:
+            if subscription._window is None:
+                subscription.flush()
+
     def register_id(self, cmd_type, obj):
         """Registers an object (through its integration id) to receive update
         notifications. This is the core mechanism how Output and Keypad objects get
         notified when the controller sends status updates."""
+        if self._staged_ids is not None:
+            ids = self._staged_ids.setdefault(cmd_type, {})
+            if obj.id in ids:
+                raise IntegrationIdExistsError
+            ids[obj.id] = obj
+            return
         ids = self._ids.setdefault(cmd_type, {})
         if obj.id in ids:
             raise IntegrationIdExistsError
         self._ids[cmd_type][obj.id] = obj
+        lazy_ids = self._lazy_ids.get(cmd_type)
+        if lazy_ids:
+            lazy_ids.pop(obj.id, None)
+
+    def register_lazy_id(self, cmd_type, integration_id, factory):
+        """Registers a factory for an object that hasn't been built yet. When the
+        first update for this integration id arrives, the factory is invoked to
+        build the object (which must then register_id() itself) and the update is
+        routed to it."""
+        ids = self._ids.get(cmd_type, {})
+        lazy_ids = self._lazy_ids.setdefault(cmd_type, {})
+        if integration_id in ids or integration_id in lazy_ids:
+            raise IntegrationIdExistsError
+        lazy_ids[integration_id] = factory
 
     def _dispatch_legacy_subscriber(self, obj, *args, **kwargs):
         """This dispatches the registered callback for 'obj'. This is only used
@@ -94,73 +316,156 @@ class Lutron(object):
 
     def _recv(self, line):
         """Invoked by the connection manager to process incoming data."""
-        if line == "":
+        tracer = self._tracer
+        if tracer is None:
+            target = self._parse_line(line)
+            if target is not None:
+                target[0].handle_update(target[1])
             return
+        start = time.perf_counter()
+        target = self._parse_line(line)
+        parsed = time.perf_counter()
+        tracer.stage("parse", parsed - start)
+        if target is not None:
+            target[0].handle_update(target[1])
+            tracer.stage("handle_update", time.perf_counter() - parsed)
+
+    def _parse_line(self, line):
+        """Parses a line received from the controller. Returns the
+        (entity, args) the update is for, or None if there is none."""
+        if line == "":
+            return None
         # Only handle query response messages, which are also sent on remote status
         # updates (e.g. user manually pressed a keypad button)
         if line[0] != Lutron.OP_RESPONSE:
             _LOGGER.debug("ignoring %s" % line)
-            return
+            self._metrics.lines_ignored += 1
+            return None
         parts = line[1:].split(",")
         cmd_type = parts[0]
         integration_id = int(parts[1])
         args = parts[2:]
-        if cmd_type not in self._ids:
+        if cmd_type not in self._ids and cmd_type not in self._lazy_ids:
             _LOGGER.info("Unknown cmd %s (%s)" % (cmd_type, line))
-            return
-        ids = self._ids[cmd_type]
-        if integration_id not in ids:
-            _LOGGER.warning("Unknown id %d (%s)" % (integration_id, line))
-            return
-        obj = ids[integration_id]
-        handled = obj.handle_update(args)
+            self._metrics.unknown_cmd += 1
+            return None
+        self._metrics.lines_received[cmd_type] += 1
+        obj = self._ids.get(cmd_type, {}).get(integration_id)
+        if obj is None:
+            factory = self._lazy_ids.get(cmd_type, {}).get(integration_id)
+            if factory is None:
+                _LOGGER.warning("Unknown id %d (%s)" % (integration_id, line))
+                self._metrics.unknown_id += 1
+                return None
+            obj = factory()
+        return obj, args
+
+    def _on_connect(self):
+        """Invoked by the connection manager whenever it (re)connects."""
+        self._state_epoch = time.monotonic()
 
     def connect(self):
         """Connects to the Lutron controller to send and receive commands and status"""
         self._conn.connect()
 
+    @staticmethod
+    def _format(op, cmd, integration_id, *args):
+        """Formats a command for the Lutron controller."""
+        out_cmd = ",".join((cmd, str(integration_id)) + tuple((str(x) for x in args)))
+        return op + out_cmd
+
     def send(self, op, cmd, integration_id, *args):
         """Formats and sends the requested command to the Lutron controller."""
-        out_cmd = ",".join((cmd, str(integration_id)) + tuple((str(x) for x in args)))
-        self._conn.send(op + out_cmd)
+        self._conn.send(Lutron._format(op, cmd, integration_id, *args))
+
+    def send_batch(self, commands):
+        """Formats and sends several commands in a single write.
+
+        commands: iterable of (op, cmd, integration_id, *args) tuples, as would be
+                  passed to send().
+        """
+        cmds = [Lutron._format(*command) for command in commands]
+        if cmds:
+            self._conn.send_many(cmds)
 
-    def load_xml_db(self, cache_path=None):
+    def send_raw(self, data):
+        """Sends pre-encoded commands (bytes, each terminated by CRLF) in a single
+        write, e.g. a compiled Macro."""
+        if data:
+            self._conn.send_raw(data)
+
+    def load_xml_db(
+        self, cache_path=None, lazy=False, validate_cache=False, compress_cache=None
+    ):
         """Load the Lutron database from the server.
 
         If a locally cached copy is available, use that instead.
-        """
 
-        xml_db = None
-        loaded_from = None
-        if cache_path:
-            try:
-                with open(cache_path, "rb") as f:
-                    xml_db = f.read()
-                    loaded_from = "cache"
-            except Exception:
-                pass
-        if not loaded_from:
-            import urllib.request
+        If lazy is True, keypad buttons/LEDs and motion sensors are only built
+        when they are first accessed or when their first event arrives. This
+        speeds up loading and saves memory on large, keypad-heavy projects.
 
-            url = "http://" + self._host + "/DbXmlInfo.xml"
-            with urllib.request.urlopen(url) as xmlfile:
-                xml_db = xmlfile.read()
-                loaded_from = "repeater"
+        If validate_cache is True, the cached copy is checked against the
+        repeater with a conditional request and only re-downloaded when the
+        project has changed. compress_cache stores the cache gzip-compressed
+        (defaults to True when cache_path ends with ".gz").
+        """
+        fetcher = XmlDbFetcher(self._host, cache_path, compress=compress_cache)
+        xml_db, loaded_from = fetcher.fetch(validate=validate_cache)
 
         _LOGGER.info("Loaded xml db from %s" % loaded_from)
 
-        parser = LutronXmlDbParser(lutron=self, xml_db_str=xml_db)
+        parser = LutronXmlDbParser(lutron=self, xml_db_str=xml_db, lazy=lazy)
         assert parser.parse()  # throw our own exception
         self._areas = parser.areas
         self._outputs = [output for area in self.areas for output in area.outputs]
+        self._registry = parser.registry
         self._name = parser.project_name
 
         _LOGGER.info(
             "Found Lutron project: %s, %d areas" % (self._name, len(self.areas))
         )
 
-        if cache_path and loaded_from == "repeater":
-            with open(cache_path, "wb") as f:
-                f.write(xml_db)
-
         return True
+
+    def reload_xml_db(self, cache_path=None, validate_cache=True, compress_cache=None):
+        """Reloads the Lutron database after the project has been reprogrammed.
+
+        The new database is diffed against the live entities by UUID (falling
+        back to integration id). Existing entities are kept and updated in place,
+        so subscriptions survive; only added/removed entities change. The
+        connection is left untouched. Lazily built components are materialized.
+
+        Returns an XmlDbDiff describing what changed.
+        """
+        fetcher = XmlDbFetcher(self._host, cache_path, compress=compress_cache)
+        xml_db, loaded_from = fetcher.fetch(validate=validate_cache)
+
+        _LOGGER.info("Reloading xml db from %s" % loaded_from)
+
+        with self._lazy_lock:
+            # Build everything that's still lazy so it takes part in the diff.
+            for _ in _iter_entities(self._areas):
+                pass
+            self._staged_ids = {}
+            try:
+                parser = LutronXmlDbParser(lutron=self, xml_db_str=xml_db)
+                assert parser.parse()  # throw our own exception
+                staged_ids = self._staged_ids
+            finally:
+                self._staged_ids = None
+
+            areas, diff, substitute = merge_areas(self._areas, parser.areas)
+            self._ids = {
+                cmd_type: {obj.id: obj for obj in map(substitute, ids.values())}
+                for cmd_type, ids in staged_ids.items()
+            }
+            self._lazy_ids = {}
+            self._areas = areas
+            self._outputs = [output for area in areas for output in area.outputs]
+            self._registry = EntityRegistry()
+            self._registry.add_areas(areas)
+            self._name = parser.project_name
+
+        _LOGGER.info("Reloaded Lutron project: %s, %s" % (self._name, diff))
+        return diff
@@ -1,11 +1,12 @@
 import threading
-import telnetlib
 import socket
 import time
 
 
 from pylutron.exceptions import ConnectionExistsError, _EXPECTED_NETWORK_EXCEPTIONS
 from pylutron.logger import _LOGGER
+from pylutron.send_queue import _CoalescingSendQueue
+from pylutron.transport import _SocketTransport
 
 
 class LutronConnection(threading.Thread):
@@ -15,19 +16,60 @@ class LutronConnection(threading.Thread):
     PW_PROMPT = b"password: "
     PROMPT = b"GNET> "
 
-    def __init__(self, host, user, password, recv_callback):
-        """Initializes the lutron connection, doesn't actually connect."""
+    def __init__(
+        self,
+        host,
+        user,
+        password,
+        recv_callback,
+        coalesce_interval=None,
+        connect_callback=None,
+        metrics=None,
+        port=23,
+        read_done_callback=None,
+    ):
+        """Initializes the lutron connection to host:port (or to the Unix
+        socket host if port is None), doesn't actually connect.
+
+        connect_callback, if given, is called (with no arguments) every time the
+        connection is (re)established. read_done_callback, if given, is called
+        (with no arguments) after all the lines of one read were passed to
+        recv_callback. metrics, if given, is a Metrics object
+        to record connection statistics in.
+
+        If coalesce_interval is given, commands are queued and written by a
+        separate thread at most once every coalesce_interval seconds; a level
+        command for an output replaces one for the same output that is still
+        queued (see _CoalescingSendQueue)."""
         threading.Thread.__init__(self)
 
         self._host = host
+        self._port = port
         self._user = user.encode("ascii")
         self._password = password.encode("ascii")
-        self._telnet = None
+        self._transport = None
         self._connected = False
         self._lock = threading.Lock()
         self._connect_cond = threading.Condition(lock=self._lock)
         self._recv_cb = recv_callback
+        self._connect_cb = connect_callback
+        self._read_done_cb = read_done_callback
+        self._metrics = metrics
+        # Set by Lutron.set_tracer().
+        self._tracer = None
+        # Called with the raw lines of each read, added by LutronHub. Replaced,
+        # never modified, so the receive thread can iterate without a lock.
+        self._line_listeners = ()
         self._done = False
+        self._coalesce_interval = coalesce_interval
+        self._queue = None
+        if coalesce_interval is not None:
+            self._queue = _CoalescingSendQueue()
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        if metrics is not None:
+            metrics.connected = lambda: self._connected
+            if self._queue is not None:
+                metrics.send_queue_depth = lambda: self._queue.depth
 
         self.setDaemon(True)
 
@@ -39,19 +81,29 @@ class LutronConnection(threading.Thread):
         # an event signifying that connection is established. This
         # ensures that the caller only resumes when we are fully connected.
         self.start()
+        if self._queue is not None:
+            self._writer.start()
         with self._lock:
             self._connect_cond.wait_for(lambda: self._connected)
 
-    def _send_locked(self, cmd):
-        """Sends the specified command to the lutron controller.
+    def _send_locked(self, *cmds):
+        """Sends the specified command(s) to the lutron controller in a single
+        write.
+
+        Assumes self._lock is held.
+        """
+        _LOGGER.debug("Sending: %s" % ", ".join(cmds))
+        self._write_locked(b"".join(cmd.encode("ascii") + b"\r\n" for cmd in cmds))
+
+    def _write_locked(self, data):
+        """Writes already encoded commands to the lutron controller.
 
         Assumes self._lock is held.
         """
-        _LOGGER.debug("Sending: %s" % cmd)
         try:
-            self._telnet.write(cmd.encode("ascii") + b"\r\n")
+            self._transport.write(data)
         except _EXPECTED_NETWORK_EXCEPTIONS:
-            _LOGGER.exception("Error sending {}".format(cmd))
+            _LOGGER.exception("Error sending {}".format(data))
             self._disconnect_locked()
 
     def send(self, cmd):
@@ -65,16 +117,66 @@ class LutronConnection(threading.Thread):
                     "Ignoring send of '%s' because we are disconnected." % cmd
                 )
                 return
-            self._send_locked(cmd)
+            if self._queue is None:
+                self._send_locked(cmd)
+                return
+        self._queue.put(cmd.encode("ascii") + b"\r\n")
 
-    def _do_login_locked(self):
-        """Executes the login procedure (telnet) as well as setting up some
-        connection defaults like turning off the prompt, etc."""
-        self._telnet = telnetlib.Telnet(self._host, timeout=2)  # 2 second timeout
+    def send_many(self, cmds):
+        """Sends the specified commands to the lutron controller in a single write.
+
+        Must not hold self._lock.
+        """
+        with self._lock:
+            if not self._connected:
+                _LOGGER.debug(
+                    "Ignoring send of %d commands because we are disconnected."
+                    % len(cmds)
+                )
+                return
+            if self._queue is None:
+                self._send_locked(*cmds)
+                return
+        self._queue.put(b"".join(cmd.encode("ascii") + b"\r\n" for cmd in cmds))
+
+    def send_raw(self, data):
+        """Sends already encoded, CRLF terminated commands (bytes) to the lutron
+        controller in a single write.
 
-        # Ensure we know that connection goes away somewhat quickly
+        Must not hold self._lock.
+        """
+        with self._lock:
+            if not self._connected:
+                _LOGGER.debug(
+                    "Ignoring send of %d bytes because we are disconnected." % len(data)
+                )
+                return
+            if self._queue is None:
+                _LOGGER.debug("Sending: %s" % data)
+                self._write_locked(data)
+                return
+        self._queue.put(data)
+
+    def _write_loop(self):
+        """Body of the writer thread used when coalescing: writes everything
+        queued at once, then waits coalesce_interval so that commands sent
+        meanwhile can be coalesced."""
+        while True:
+            data = self._queue.take()
+            with self._lock:
+                if self._connected:
+                    _LOGGER.debug("Sending: %s" % data)
+                    self._write_locked(data)
+                else:
+                    _LOGGER.debug(
+                        "Dropping %d queued bytes because we are disconnected."
+                        % len(data)
+                    )
+            time.sleep(self._coalesce_interval)
+
+    @staticmethod
+    def _configure_keepalive(sock):
         try:
-            sock = self._telnet.get_socket()
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             # Some operating systems may not include TCP_KEEPIDLE (macOS, variants of Windows)
             if hasattr(socket, "TCP_KEEPIDLE"):
@@ -87,11 +189,26 @@ class LutronConnection(threading.Thread):
         except OSError:
             _LOGGER.exception("error configuring socket")
 
-        self._telnet.read_until(LutronConnection.USER_PROMPT, timeout=3)
-        self._telnet.write(self._user + b"\r\n")
-        self._telnet.read_until(LutronConnection.PW_PROMPT, timeout=3)
-        self._telnet.write(self._password + b"\r\n")
-        self._telnet.read_until(LutronConnection.PROMPT, timeout=3)
+    def _do_login_locked(self):
+        """Executes the login procedure (telnet) as well as setting up some
+        connection defaults like turning off the prompt, etc."""
+        self._transport = _SocketTransport(
+            self._host, self._port, timeout=2
+        )  # 2 second timeout
+
+        # Ensure we know that connection goes away somewhat quickly (TCP only,
+        # a hub's Unix socket goes away with the hub).
+        if self._port is not None:
+            self._configure_keepalive(self._transport.sock)
+
+        t = self._transport
+        t.read_until(LutronConnection.USER_PROMPT, timeout=3)
+        t.write(t.take_replies() + self._user + b"\r\n")
+        t.read_until(LutronConnection.PW_PROMPT, timeout=3)
+        t.write(t.take_replies() + self._password + b"\r\n")
+        t.read_until(LutronConnection.PROMPT, timeout=3)
+        if t.replies:
+            t.write(t.take_replies())
 
         self._send_locked("#MONITORING,12,2")
         self._send_locked("#MONITORING,255,2")
@@ -106,9 +223,19 @@ class LutronConnection(threading.Thread):
         was_connected = self._connected
         self._connected = False
         self._connect_cond.notify_all()
-        self._telnet = None
+        transport = self._transport
+        if transport is not None:
+            self._transport = None
+            if threading.current_thread() is self:
+                transport.close()
+            else:
+                # The receive thread may be waiting on the socket: wake it up
+                # with EOF and let it close the socket.
+                transport.shutdown()
         if was_connected:
             _LOGGER.warning("Disconnected")
+            if self._metrics is not None:
+                self._metrics.disconnects += 1
 
     def _maybe_reconnect(self):
         """Reconnects to the controller if we have been previously disconnected."""
@@ -116,40 +243,75 @@ class LutronConnection(threading.Thread):
             if not self._connected:
                 _LOGGER.info("Connecting")
                 # This can throw an exception, but we'll catch it in run()
+                start = time.monotonic()
                 self._do_login_locked()
                 self._connected = True
                 self._connect_cond.notify_all()
                 _LOGGER.info("Connected")
+                if self._metrics is not None:
+                    self._metrics.connects += 1
+                    self._metrics.login_seconds = time.monotonic() - start
+                if self._connect_cb is not None:
+                    self._connect_cb()
 
     def _main_loop(self):
         """Main body of the the thread function.
 
         This will maintain connection and receive remote status updates.
         """
+        t = None
         while True:
-            line = b""
+            lines = ()
             try:
                 self._maybe_reconnect()
                 # If someone is sending a command, we can lose our connection so grab a
                 # copy beforehand. We don't need the lock because if the connection is
-                # open, we are the only ones that will read from telnet (the reconnect
-                # code runs synchronously in this loop).
-                t = self._telnet
-                if t is not None:
-                    line = t.read_until(b"\n", timeout=3)
+                # open, we are the only ones that will read from the transport (the
+                # reconnect code runs synchronously in this loop).
+                if t is not None and t is not self._transport:
+                    # Shut down by another thread, see _disconnect_locked().
+                    t.close()
+                t = self._transport
+                tracer = self._tracer
+                if t is not None and tracer is not None:
+                    start = time.perf_counter()
+                    lines = t.read_lines(timeout=3)
+                    if lines:
+                        tracer.stage("read", time.perf_counter() - start)
+                elif t is not None:
+                    lines = t.read_lines(timeout=3)
                 else:
-                    raise EOFError("Telnet object already torn down")
+                    raise EOFError("Transport already torn down")
             except _EXPECTED_NETWORK_EXCEPTIONS:
                 _LOGGER.exception("Uncaught exception")
                 try:
                     self._lock.acquire()
                     self._disconnect_locked()
+                    if t is not None:
+                        t.close()
+                        t = None
                     # don't spam reconnect
                     time.sleep(1)
                     continue
                 finally:
                     self._lock.release()
-            self._recv_cb(line.decode("ascii").rstrip())
+            if t.replies:
+                # Telnet negotiation replies, written under the lock so they
+                # don't interleave with commands sent by other threads.
+                with self._lock:
+                    if self._transport is t:
+                        self._write_locked(t.take_replies())
+            if not lines:
+                continue
+            for listener in self._line_listeners:
+                listener(lines)
+            if self._metrics is not None:
+                self._metrics.last_line_time = time.monotonic()
+            recv_cb = self._recv_cb
+            for line in lines:
+                recv_cb(line.decode("ascii").rstrip())
+            if self._read_done_cb is not None:
+                self._read_done_cb()
 
     def run(self):
         """Main entry point into our receive thread.
@@ -0,0 +1,188 @@
+import threading
+
+from pylutron.entities import Button, Led, Output, ShadeGroup
+from pylutron.exceptions import InvalidMacroStep
+from pylutron.logger import _LOGGER
+
+
+class Macro(object):
+    """A reusable sequence of commands, e.g. an "evening" scene that sets 30
+    outputs and a few LEDs.
+
+    Steps are added with set_level(), set_led(), press()/release() and wait().
+    compile() validates every step against the entities currently registered
+    with the Lutron object and encodes the commands to bytes once; run() then
+    sends each group of commands between waits as a single write. Waits are
+    calls scheduled on the Lutron object's shared scheduler, run() itself never
+    blocks.
+
+    Compile again (or call invalidate()) after Lutron.reload_xml_db() if the
+    macro refers to entities that may have been removed.
+    """
+
+    def __init__(self, lutron, name=None):
+        """Initializes an empty macro for the given Lutron object."""
+        self._lutron = lutron
+        self._name = name
+        # Each step is either a float (wait that many seconds) or a
+        # (entity, encode, apply) tuple: encode() returns the encoded command
+        # and apply(), if not None, updates the cached state once it was sent.
+        self._steps = []
+        # List of (delay before sending, payload, apply callbacks) segments.
+        self._compiled = None
+        self._lock = threading.Lock()
+        # The scheduled call that sends the next segment of the current run;
+        # _run_id is bumped by run() and cancel() so that a call already firing
+        # sends nothing.
+        self._pending = None
+        self._run_id = 0
+
+    def __repr__(self):
+        """Returns a stringified representation of this object."""
+        return str({"name": self._name, "steps": len(self._steps)})
+
+    @property
+    def name(self):
+        """Returns the name of this macro."""
+        return self._name
+
+    def set_level(self, target, level, fade_time=None, delay=None):
+        """Adds a step that sets the level of an Output (or Shade) or of a
+        ShadeGroup, optionally with a fade and delay."""
+        if not isinstance(target, (Output, ShadeGroup)):
+            raise InvalidMacroStep("Can't set the level of %r" % (target,))
+        if not 0.0 <= level <= 100.0:
+            raise InvalidMacroStep("Invalid level %r for %s" % (level, target.name))
+        return self._add(
+            target,
+            lambda: target._level_command(level, fade_time, delay),
+            lambda: target._apply_level(level, fade_time, delay),
+        )
+
+    def set_led(self, led, state):
+        """Adds a step that turns a keypad Led on or off."""
+        if not isinstance(led, Led):
+            raise InvalidMacroStep("%r is not a Led" % (led,))
+
+        def apply():
+            led._keypad._set_led_state(led.number, state)
+
+        return self._add(led, lambda: led._state_command(state), apply)
+
+    def press(self, button):
+        """Adds a step that presses a keypad Button."""
+        return self._add_button(button, Button._ACTION_PRESS)
+
+    def release(self, button):
+        """Adds a step that releases a keypad Button."""
+        return self._add_button(button, Button._ACTION_RELEASE)
+
+    def wait(self, seconds):
+        """Adds a pause of the given number of seconds between steps."""
+        if seconds < 0:
+            raise InvalidMacroStep("Invalid wait %r" % (seconds,))
+        self._steps.append(float(seconds))
+        self._compiled = None
+        return self
+
+    def _add_button(self, button, action):
+        if not isinstance(button, Button):
+            raise InvalidMacroStep("%r is not a Button" % (button,))
+        return self._add(button, lambda: button._action_command(action), None)
+
+    def _add(self, entity, encode, apply):
+        self._steps.append((entity, encode, apply))
+        self._compiled = None
+        return self
+
+    def _check_registered(self, entity):
+        """Raises InvalidMacroStep unless entity is the object the Lutron object
+        currently dispatches to for its integration id."""
+        keypad = getattr(entity, "_keypad", None)
+        owner = keypad if keypad is not None else entity
+        registered = self._lutron._ids.get(owner._CMD_TYPE, {}).get(owner.id)
+        if registered is not owner or (
+            keypad is not None
+            and keypad._get_component(entity.component_number) is not entity
+        ):
+            raise InvalidMacroStep("%s is not part of this project" % entity.name)
+
+    def compile(self):
+        """Validates all the steps and encodes them. Called by run() if needed."""
+        segments = []
+        pending_wait = 0.0
+        payload = []
+        applies = []
+        for step in self._steps:
+            if isinstance(step, float):
+                if payload:
+                    segments.append((pending_wait, b"".join(payload), applies))
+                    pending_wait, payload, applies = 0.0, [], []
+                pending_wait += step
+                continue
+            entity, encode, apply = step
+            self._check_registered(entity)
+            payload.append(encode())
+            if apply is not None:
+                applies.append(apply)
+        if payload:
+            segments.append((pending_wait, b"".join(payload), applies))
+        self._compiled = segments
+        return self
+
+    def invalidate(self):
+        """Drops the compiled form, the next run() compiles the macro again."""
+        self._compiled = None
+
+    def run(self):
+        """Sends the macro. The commands before the first wait are sent right
+        away; the rest are sent from the Lutron object's scheduler. Returns
+        immediately.
+
+        Runs don't overlap: running a macro that is still running cancels the
+        commands of the previous run that weren't sent yet, and starts over."""
+        if self._compiled is None:
+            self.compile()
+        with self._lock:
+            self._run_id += 1
+            run_id = self._run_id
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.cancel()
+        self._run_segment(self._compiled, 0, run_id)
+
+    def cancel(self):
+        """Cancels the commands of the running macro that haven't been sent
+        yet."""
+        with self._lock:
+            self._run_id += 1
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.cancel()
+
+    def _run_segment(self, segments, index, run_id):
+        """Sends segments[index] (after its wait) and schedules the next one."""
+        if index >= len(segments):
+            return
+        wait = segments[index][0]
+        if wait <= 0:
+            self._send_segment(segments, index, run_id)
+            return
+        with self._lock:
+            if run_id != self._run_id:
+                return
+            self._pending = self._lutron._scheduler.call_later(
+                wait, self._send_segment, segments, index, run_id
+            )
+
+    def _send_segment(self, segments, index, run_id):
+        with self._lock:
+            if run_id != self._run_id:
+                return
+            self._pending = None
+        _, payload, applies = segments[index]
+        _LOGGER.debug("Macro %s: sending step group %d" % (self._name, index))
+        self._lutron.send_raw(payload)
+        for apply in applies:
+            apply()
+        self._run_segment(segments, index + 1, run_id)
@@ -0,0 +1,174 @@
+import collections
+import http.server
+import math
+import threading
+import time
+
+
+class Metrics(object):
+    """Counters and gauges describing a Lutron object and its connection.
+
+    Counters are plain integers updated from the connection thread without
+    locking; a scrape may be off by an in-flight increment, which is fine for
+    monitoring. render_prometheus() returns them in the Prometheus text
+    exposition format, and MetricsServer serves that over HTTP.
+    """
+
+    def __init__(self):
+        # cmd type (e.g. "OUTPUT") -> number of ~ lines received.
+        self.lines_received = collections.defaultdict(int)
+        self.lines_ignored = 0
+        self.unknown_cmd = 0
+        self.unknown_id = 0
+        self.events_dispatched = 0
+        self.handler_errors = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.login_seconds = None
+        # time.monotonic() of the last line received, None if none yet.
+        self.last_line_time = None
+        # Callables returning the current value of gauges owned by others.
+        self.connected = lambda: False
+        self.send_queue_depth = lambda: 0
+
+    @property
+    def reconnects(self):
+        """Number of connections made after the first one."""
+        return max(self.connects - 1, 0)
+
+    def seconds_since_last_line(self):
+        """Seconds since a line was last received, or None."""
+        if self.last_line_time is None:
+            return None
+        return time.monotonic() - self.last_line_time
+
+    def render_prometheus(self):
+        """Returns all the metrics in the Prometheus text exposition format."""
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            out.append("# HELP %s %s" % (name, help_text))
+            out.append("# TYPE %s %s" % (name, kind))
+            for labels, value in samples:
+                if value is None:
+                    value = math.nan
+                out.append("%s%s %s" % (name, labels, _format_value(value)))
+
+        metric(
+            "pylutron_lines_received_total",
+            "counter",
+            "Status lines received from the repeater, by command type.",
+            [
+                ('{cmd="%s"}' % cmd, count)
+                for cmd, count in sorted(self.lines_received.items())
+            ],
+        )
+        metric(
+            "pylutron_lines_ignored_total",
+            "counter",
+            "Lines received that aren't status reports (prompts, echoes).",
+            [("", self.lines_ignored)],
+        )
+        metric(
+            "pylutron_unknown_lines_total",
+            "counter",
+            "Status lines dropped because the command type or id is unknown.",
+            [('{reason="cmd"}', self.unknown_cmd), ('{reason="id"}', self.unknown_id)],
+        )
+        metric(
+            "pylutron_events_dispatched_total",
+            "counter",
+            "Entity events dispatched to subscribers.",
+            [("", self.events_dispatched)],
+        )
+        metric(
+            "pylutron_handler_errors_total",
+            "counter",
+            "Exceptions raised by event subscribers.",
+            [("", self.handler_errors)],
+        )
+        metric(
+            "pylutron_reconnects_total",
+            "counter",
+            "Connections to the repeater made after the first one.",
+            [("", self.reconnects)],
+        )
+        metric(
+            "pylutron_disconnects_total",
+            "counter",
+            "Connections to the repeater that were lost.",
+            [("", self.disconnects)],
+        )
+        metric(
+            "pylutron_connected",
+            "gauge",
+            "1 if connected to the repeater.",
+            [("", int(bool(self.connected())))],
+        )
+        metric(
+            "pylutron_login_seconds",
+            "gauge",
+            "Duration of the last login to the repeater.",
+            [("", self.login_seconds)],
+        )
+        metric(
+            "pylutron_send_queue_depth",
+            "gauge",
+            "Commands queued but not yet written (coalescing mode).",
+            [("", self.send_queue_depth())],
+        )
+        metric(
+            "pylutron_seconds_since_last_line",
+            "gauge",
+            "Seconds since the last line was received from the repeater.",
+            [("", self.seconds_since_last_line())],
+        )
+        out.append("")
+        return "\n".join(out)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        return repr(value)
+    return str(value)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(object):
+    """Serves Metrics over HTTP (GET /metrics) from a daemon thread."""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9464):
+        self._server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.metrics = metrics
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="pylutron-metrics", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def port(self):
+        """The port the server listens on (useful when started with port 0)."""
+        return self._server.server_address[1]
+
+    def shutdown(self):
+        """Stops the server."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,168 @@
+from collections import defaultdict
+
+from pylutron.entities import Keypad, Output
+
+
+class EntityRegistry(object):
+    """Indexes all the entities of a Lutron project for fast lookups.
+
+    The XML parser fills the registry in the same pass that builds the entities.
+    Primary lookups (by UUID, by command type + integration id) are O(1). The
+    secondary indexes (by name, class, output type, keypad type and area) can be
+    combined with find(), which starts from the most selective index.
+
+    When the project was loaded lazily, components and sensors that haven't been
+    built yet are registered as pending callbacks; they're built on the first
+    query that could return them.
+    """
+
+    def __init__(self):
+        self._by_uuid = {}
+        self._by_id = {}
+        self._by_name = defaultdict(list)
+        self._by_class = defaultdict(list)
+        self._by_output_type = defaultdict(list)
+        self._by_keypad_type = defaultdict(list)
+        self._by_area = defaultdict(list)
+        self._area_of = {}
+        # (classes, callback) tuples; callback registers lazily built entities.
+        self._pending = []
+
+    def __len__(self):
+        self._flush()
+        return len(self._area_of)
+
+    def add(self, entity, area):
+        """Adds an entity that lives in area to all the indexes."""
+        if entity in self._area_of:
+            return
+        self._area_of[entity] = area
+        if entity.uuid:
+            self._by_uuid[entity.uuid] = entity
+        cmd_type = getattr(entity, "_CMD_TYPE", None)
+        if cmd_type is not None and entity.id is not None:
+            self._by_id[(cmd_type, entity.id)] = entity
+        self._by_name[entity.name].append(entity)
+        self._by_class[type(entity)].append(entity)
+        if isinstance(entity, Output):
+            self._by_output_type[entity.type].append(entity)
+        elif isinstance(entity, Keypad):
+            self._by_keypad_type[entity.type].append(entity)
+        self._by_area[area].append(entity)
+
+    def add_pending(self, classes, callback):
+        """Registers a callback that builds and add()s entities of the given
+        classes. It is invoked before the first query that could return them."""
+        self._pending.append((tuple(classes), callback))
+
+    def add_areas(self, areas):
+        """Adds every entity reachable from areas, building lazy ones."""
+        for area in areas:
+            if area.occupancy_group:
+                self.add(area.occupancy_group, area)
+            for output in area.outputs:
+                self.add(output, area)
+            for keypad in area.keypads:
+                self.add(keypad, area)
+                for component in keypad.buttons + keypad.leds:
+                    self.add(component, area)
+            for sensor in area.sensors:
+                self.add(sensor, area)
+            for shade_group in area.shade_groups:
+                self.add(shade_group, area)
+
+    def _flush(self, cls=None):
+        """Builds the pending entities that could be instances of cls (all of
+        them if cls is None)."""
+        if not self._pending:
+            return
+        remaining = []
+        for classes, callback in self._pending:
+            if cls is None or any(
+                issubclass(c, cls) or issubclass(cls, c) for c in classes
+            ):
+                callback()
+            else:
+                remaining.append((classes, callback))
+        self._pending = remaining
+
+    def get_by_uuid(self, uuid):
+        """Returns the entity with the given UUID, or None."""
+        entity = self._by_uuid.get(uuid)
+        if entity is None and self._pending:
+            self._flush()
+            entity = self._by_uuid.get(uuid)
+        return entity
+
+    def get(self, cmd_type, integration_id):
+        """Returns the entity registered for the command type (e.g. "OUTPUT",
+        "DEVICE", "GROUP") and integration id, or None."""
+        entity = self._by_id.get((cmd_type, integration_id))
+        if entity is None and self._pending:
+            self._flush()
+            entity = self._by_id.get((cmd_type, integration_id))
+        return entity
+
+    def get_by_name(self, name):
+        """Returns the tuple of entities with the given name."""
+        self._flush()
+        return tuple(self._by_name.get(name, ()))
+
+    def area_of(self, entity):
+        """Returns the Area the entity belongs to, or None."""
+        return self._area_of.get(entity)
+
+    def find(
+        self,
+        cls=None,
+        name=None,
+        output_type=None,
+        keypad_type=None,
+        area=None,
+        subtree=False,
+    ):
+        """Returns the list of entities matching all the given filters.
+
+        cls: entity class; subclasses match too (e.g. Output matches Shade).
+        name: exact entity name.
+        output_type: Output type, e.g. "INC" or "SYSTEM_SHADE".
+        keypad_type: Keypad type, e.g. "SEETOUCH_KEYPAD".
+        area: only entities in this Area (and its nested areas, with subtree).
+        """
+        self._flush(cls)
+        candidates = []
+        if name is not None:
+            candidates.append(self._by_name.get(name, []))
+        if output_type is not None:
+            candidates.append(self._by_output_type.get(output_type, []))
+        if keypad_type is not None:
+            candidates.append(self._by_keypad_type.get(keypad_type, []))
+        if area is not None:
+            areas = [area]
+            if subtree:
+                stack = list(area.children)
+                while stack:
+                    child = stack.pop()
+                    areas.append(child)
+                    stack.extend(child.children)
+            candidates.append(
+                [entity for a in areas for entity in self._by_area.get(a, [])]
+            )
+        if cls is not None:
+            candidates.append(
+                [
+                    entity
+                    for entity_cls, entities in self._by_class.items()
+                    if issubclass(entity_cls, cls)
+                    for entity in entities
+                ]
+            )
+        if not candidates:
+            return list(self._area_of)
+
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            members = set(other)
+            result = [entity for entity in result if entity in members]
+        return result
@@ -1,4 +1,5 @@
 import threading
+import time
 
 
 class _RequestHelper(object):
@@ -19,21 +20,33 @@ class _RequestHelper(object):
     wait list is cleared.
 
     NOTE: Only the first enqueued action is executed as the assumption is that the
-    queries will be identical in nature.
+    queries will be identical in nature. If no reply arrived within
+    _RESEND_AFTER seconds (e.g. it was lost on a reconnect), the next request
+    executes its action again.
     """
 
+    __slots__ = ("__lock", "__events", "__sent")
+
+    _RESEND_AFTER = 1.0
+
     def __init__(self):
         """Initialize the request helper class."""
         self.__lock = threading.Lock()
         self.__events = []
+        self.__sent = 0.0
 
     def request(self, action):
         """Request an action to be performed, in case one."""
         ev = threading.Event()
         first = False
+        now = time.monotonic()
         with self.__lock:
-            if len(self.__events) == 0:
+            if (
+                len(self.__events) == 0
+                or now - self.__sent > _RequestHelper._RESEND_AFTER
+            ):
                 first = True
+                self.__sent = now
             self.__events.append(ev)
         if first:
             action()
@@ -0,0 +1,175 @@
+import threading
+import time
+
+from pylutron.exceptions import InvalidRule
+from pylutron.logger import _LOGGER
+from pylutron.macro import Macro
+
+
+def _compile_condition(condition):
+    """Returns condition as a callable(entity, params) -> bool, or None.
+
+    condition may be a callable or a dict of event params that must all be
+    equal, e.g. {"state": OccupancyGroup.State.OCCUPIED}."""
+    if condition is None or callable(condition):
+        return condition
+    expected = tuple(condition.items())
+
+    def matches(entity, params):
+        for key, value in expected:
+            if params.get(key) != value:
+                return False
+        return True
+
+    return matches
+
+
+def _compile_action(action):
+    """Returns action as a callable(entity, event, params)."""
+    if isinstance(action, Macro):
+        action.compile()
+        return lambda entity, event, params: action.run()
+    if callable(action):
+        return action
+    raise InvalidRule("Invalid rule action %r" % (action,))
+
+
+class Rule(object):
+    """Runs actions when an entity generates an event.
+
+    entity, event: the trigger, e.g. a Button and Button.Event.PRESSED.
+    actions: a Macro (its commands go out in a single write), a
+             callable(entity, event, params), or a list of them, run in order.
+    condition: optional callable(entity, params) -> bool, or a dict of event
+               params that must match, e.g. {"state": OccupancyGroup.State.VACANT}.
+    """
+
+    def __init__(self, entity, event, actions, condition=None, name=None):
+        events = getattr(type(entity), "Event", None)
+        if events is None or not isinstance(event, events):
+            raise InvalidRule("%s can't generate %s" % (type(entity).__name__, event))
+        if not isinstance(actions, (list, tuple)):
+            actions = (actions,)
+        self._entity = entity
+        self._event = event
+        self._name = name
+        self._condition = _compile_condition(condition)
+        self._actions = tuple(_compile_action(action) for action in actions)
+        self.fired = 0
+        self.skipped = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        """Returns a stringified representation of this object."""
+        return str(
+            {
+                "name": self._name,
+                "entity": self._entity.name,
+                "event": self._event.name,
+                "fired": self.fired,
+                "skipped": self.skipped,
+                "errors": self.errors,
+            }
+        )
+
+    @property
+    def name(self):
+        """Returns the name of this rule."""
+        return self._name
+
+    @property
+    def key(self):
+        """Returns the (entity, event) trigger of this rule."""
+        return (self._entity, self._event)
+
+    def _evaluate(self, entity, event, params):
+        """Runs the actions if the condition holds. Returns True if it fired."""
+        start = time.perf_counter()
+        try:
+            if self._condition is not None and not self._condition(entity, params):
+                self.skipped += 1
+                return False
+            for action in self._actions:
+                action(entity, event, params)
+            self.fired += 1
+            return True
+        except Exception:
+            self.errors += 1
+            _LOGGER.exception("Error running rule %s" % self._name)
+            return False
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class RuleEngine(object):
+    """Evaluates Rules right from the event dispatch path.
+
+    Enabled with Lutron.enable_rules(). Rules are indexed by their
+    (entity, event) trigger, so finding the rules for an event is a single dict
+    lookup no matter how many rules exist. The index is rebuilt on add() and
+    remove() and swapped in atomically, so dispatch never takes a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._events = 0
+        self._matched = 0
+        self._seconds = 0.0
+        self._max_seconds = 0.0
+
+    def add(self, rule):
+        """Adds a Rule and returns it."""
+        with self._lock:
+            index = dict(self._index)
+            index[rule.key] = index.get(rule.key, ()) + (rule,)
+            self._index = index
+        return rule
+
+    def remove(self, rule):
+        """Removes a Rule added earlier."""
+        with self._lock:
+            index = dict(self._index)
+            rules = tuple(r for r in index.get(rule.key, ()) if r is not rule)
+            if rules:
+                index[rule.key] = rules
+            else:
+                index.pop(rule.key, None)
+            self._index = index
+
+    @property
+    def rules(self):
+        """Returns a list of all the rules."""
+        return [rule for rules in self._index.values() for rule in rules]
+
+    def _on_event(self, entity, event, params):
+        """Called by LutronEntity._dispatch_event for every event."""
+        self._events += 1
+        rules = self._index.get((entity, event))
+        if rules is None:
+            return
+        self._matched += 1
+        start = time.perf_counter()
+        for rule in rules:
+            rule._evaluate(entity, event, params)
+        elapsed = time.perf_counter() - start
+        self._seconds += elapsed
+        if elapsed > self._max_seconds:
+            self._max_seconds = elapsed
+
+    def stats(self):
+        """Returns a dict with the number of events seen and matching a rule,
+        the time spent evaluating rules (seconds, total and max per event) and
+        per rule fired/skipped/error counters."""
+        rules = self.rules
+        return {
+            "events": self._events,
+            "matched_events": self._matched,
+            "eval_seconds": self._seconds,
+            "max_eval_seconds": self._max_seconds,
+            "rules": len(rules),
+            "fired": sum(rule.fired for rule in rules),
+            "skipped": sum(rule.skipped for rule in rules),
+            "errors": sum(rule.errors for rule in rules),
+        }
@@ -0,0 +1,79 @@
+import heapq
+import itertools
+import threading
+import time
+
+from pylutron.logger import _LOGGER
+
+
+class _ScheduledCall(object):
+    """A callback scheduled on a _Scheduler; cancel() prevents it from running."""
+
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancels the call if it hasn't run yet."""
+        self.cancelled = True
+
+
+class _Scheduler(object):
+    """Runs callbacks at given times from a single daemon thread.
+
+    Pending calls are kept in a heap ordered by due time, so any number of
+    timers (retries, gesture timeouts, polls) cost one thread. Callbacks run
+    on the scheduler thread and must not block for long. Cancelled calls are
+    simply skipped when they come due.
+    """
+
+    def __init__(self, name="pylutron-scheduler"):
+        self._name = name
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay, callback, *args):
+        """Runs callback(*args) after delay seconds. Returns a _ScheduledCall."""
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def call_at(self, when, callback, *args):
+        """Runs callback(*args) at time when (time.monotonic())."""
+        call = _ScheduledCall(when, callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._counter), call))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self._name, daemon=True
+                )
+                self._thread.start()
+            elif self._heap[0][2] is call:
+                # New earliest deadline, wake the thread up to wait less.
+                self._cond.notify()
+        return call
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    when, _, call = self._heap[0]
+                    if call.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+                    timeout = when - time.monotonic()
+                    if timeout <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(timeout)
+            try:
+                call.callback(*call.args)
+            except Exception:
+                _LOGGER.exception("Error in scheduled callback %s" % call.callback)
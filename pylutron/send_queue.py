@@ -0,0 +1,79 @@
+import threading
+
+# Only zone level commands are coalesced: the last level set wins, while
+# everything else (raise/lower/stop, button presses, queries) must be sent
+# exactly as requested.
+_COALESCED_PREFIX = b"#OUTPUT,"
+_COALESCED_ACTION = b"1"
+
+
+def _coalesce_key(line):
+    """Returns the key identifying the target of a coalescable command line
+    (b"#OUTPUT,<id>,1"), or None if the line must not be coalesced."""
+    if not line.startswith(_COALESCED_PREFIX):
+        return None
+    parts = line.split(b",", 3)
+    if len(parts) < 4 or parts[2] != _COALESCED_ACTION:
+        return None
+    return b",".join(parts[:3])
+
+
+class _CoalescingSendQueue(object):
+    """Queue of outgoing commands where a newer #OUTPUT level command replaces
+    a still queued one for the same output.
+
+    Any other command is a barrier: level commands queued before it are never
+    merged with the ones queued after it, so commands keep their relative order
+    whenever it matters. Between two barriers, a replaced command keeps its
+    original position, so the newest level goes out as early as possible.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # Bytes (a barrier line) or dicts of key -> line, in send order.
+        self._segments = []
+        self.coalesced = 0
+
+    def put(self, data):
+        """Queues CRLF terminated command lines (bytes)."""
+        with self._cond:
+            segments = self._segments
+            for line in data.split(b"\r\n"):
+                if not line:
+                    continue
+                key = _coalesce_key(line)
+                if key is None:
+                    segments.append(line)
+                    continue
+                tail = segments[-1] if segments else None
+                if not isinstance(tail, dict):
+                    tail = {}
+                    segments.append(tail)
+                if key in tail:
+                    self.coalesced += 1
+                tail[key] = line
+            self._cond.notify()
+
+    @property
+    def depth(self):
+        """Returns the number of queued command lines."""
+        with self._cond:
+            return sum(
+                len(segment) if isinstance(segment, dict) else 1
+                for segment in self._segments
+            )
+
+    def take(self):
+        """Waits for queued commands and returns all of them, encoded and CRLF
+        terminated, emptying the queue."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._segments)
+            segments, self._segments = self._segments, []
+        lines = []
+        for segment in segments:
+            if isinstance(segment, dict):
+                lines.extend(segment.values())
+            else:
+                lines.append(segment)
+        lines.append(b"")
+        return b"\r\n".join(lines)
@@ -0,0 +1,222 @@
+import math
+import struct
+import threading
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+
+from pylutron.entities import OccupancyGroup, Output
+from pylutron.exceptions import SharedStateError
+
+# Header: magic, layout version, number of slots, topology checksum, sequence.
+_HEADER = struct.Struct("<4sIIIQ")
+_SEQ_OFFSET = 16
+_SEQ = struct.Struct("<Q")
+_SLOTS_OFFSET = 32
+# Slot: the value (output level, or OccupancyGroup.State value), NaN if unknown.
+_SLOT = struct.Struct("<d")
+_MAGIC = b"PLSS"
+_LAYOUT_VERSION = 1
+
+# Names of the segments published by this process (or its forked parent).
+_published = set()
+
+
+def _layout(areas):
+    """Returns the entities that get a slot, outputs sorted by integration id
+    then occupancy groups sorted by integration id, and the topology checksum.
+    Publisher and readers compute this from the same XML db."""
+    outputs = sorted(
+        (output for area in areas for output in area.outputs), key=lambda o: o.id
+    )
+    # Several areas can share an occupancy group.
+    groups = {
+        area.occupancy_group.id: area.occupancy_group
+        for area in areas
+        if area.occupancy_group is not None
+    }
+    groups = sorted(groups.values(), key=lambda g: g.id)
+    topology = ",".join(
+        ["O%d" % o.id for o in outputs] + ["G%d" % g.id for g in groups]
+    )
+    return outputs + groups, zlib.crc32(topology.encode("ascii"))
+
+
+class SharedStatePublisher(object):
+    """Publishes the output levels and occupancy states of a Lutron object into
+    a multiprocessing.shared_memory segment, for SharedStateReader in other
+    processes.
+
+    Slots are laid out by integration id (see _layout). Writes are guarded by a
+    seqlock: the sequence number in the header is odd while a write is in
+    progress, so readers retry instead of taking a lock.
+
+    Started with Lutron.publish_state(). Publish again after reload_xml_db()
+    if the project changed; close() unlinks the segment.
+    """
+
+    def __init__(self, lutron, name=None):
+        self._entities, self._topology = _layout(lutron.areas)
+        size = _SLOTS_OFFSET + _SLOT.size * len(self._entities)
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._buf = self._shm.buf
+        _published.add(self._shm.name)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._closed = False
+        _HEADER.pack_into(
+            self._buf,
+            0,
+            _MAGIC,
+            _LAYOUT_VERSION,
+            len(self._entities),
+            self._topology,
+            0,
+        )
+        for slot, entity in enumerate(self._entities):
+            self._write(slot, self._initial_value(entity))
+            entity.subscribe(self._on_event, slot)
+
+    @property
+    def name(self):
+        """The name of the shared memory segment, to pass to readers."""
+        return self._shm.name
+
+    @staticmethod
+    def _initial_value(entity):
+        if entity._state_time is None:
+            return math.nan
+        if isinstance(entity, Output):
+            return entity._level
+        return entity._state.value
+
+    def _on_event(self, entity, slot, event, params):
+        if event == Output.Event.LEVEL_CHANGED:
+            self._write(slot, params["level"])
+        elif event == OccupancyGroup.Event.OCCUPANCY:
+            self._write(slot, params["state"].value)
+
+    def _write(self, slot, value):
+        with self._lock:
+            if self._closed:
+                return
+            buf = self._buf
+            _SEQ.pack_into(buf, _SEQ_OFFSET, self._seq + 1)
+            _SLOT.pack_into(buf, _SLOTS_OFFSET + _SLOT.size * slot, value)
+            self._seq += 2
+            _SEQ.pack_into(buf, _SEQ_OFFSET, self._seq)
+
+    def close(self):
+        """Stops publishing and removes the segment."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._buf = None
+        for slot, entity in enumerate(self._entities):
+            entity.unsubscribe(self._on_event, slot)
+        self._shm.close()
+        self._shm.unlink()
+        _published.discard(self._shm.name)
+
+
+class SharedStateReader(object):
+    """Reads the state published by a SharedStatePublisher, without locks.
+
+    lutron: a Lutron object with the same XML db loaded (it doesn't need to be
+        connected), used to map integration ids to slots.
+    name: the name of the publisher's segment.
+    """
+
+    # Seconds to keep retrying a read while the publisher is writing.
+    _READ_TIMEOUT = 1.0
+
+    def __init__(self, lutron, name):
+        entities, topology = _layout(lutron.areas)
+        self._shm = _attach(name)
+        self._buf = self._shm.buf
+        magic, version, slots, published_topology, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC or version != _LAYOUT_VERSION:
+            raise SharedStateError("%s is not a pylutron state segment" % name)
+        if slots != len(entities) or published_topology != topology:
+            raise SharedStateError(
+                "%s was published for a different project topology" % name
+            )
+        self._output_slots = {}
+        self._group_slots = {}
+        for slot, entity in enumerate(entities):
+            if isinstance(entity, Output):
+                self._output_slots[entity.id] = slot
+            else:
+                self._group_slots[entity.id] = slot
+        self._size = _SLOTS_OFFSET + _SLOT.size * slots
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+    def _read(self, start, end):
+        """Returns a consistent copy of buf[start:end]."""
+        buf = self._buf
+        deadline = None
+        while True:
+            seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            if not seq & 1:
+                data = bytes(buf[start:end])
+                if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] == seq:
+                    return data
+            if deadline is None:
+                deadline = time.monotonic() + SharedStateReader._READ_TIMEOUT
+            elif time.monotonic() > deadline:
+                raise SharedStateError("The publisher didn't finish writing")
+            time.sleep(0)
+
+    def _slot_value(self, slot):
+        offset = _SLOTS_OFFSET + _SLOT.size * slot
+        value = _SLOT.unpack(self._read(offset, offset + _SLOT.size))[0]
+        return None if math.isnan(value) else value
+
+    def level(self, output_id):
+        """Returns the level of the output with the given integration id, None
+        if it isn't known yet."""
+        return self._slot_value(self._output_slots[output_id])
+
+    def occupancy(self, group_id):
+        """Returns the OccupancyGroup.State of the occupancy group with the
+        given integration id, None if it isn't known yet."""
+        value = self._slot_value(self._group_slots[group_id])
+        return None if value is None else OccupancyGroup.State(int(value))
+
+    def snapshot(self):
+        """Returns a consistent snapshot of everything, as a dict with "levels"
+        (output id -> level) and "occupancy" (group id -> OccupancyGroup.State);
+        unknown states are None."""
+        data = self._read(_SLOTS_OFFSET, self._size)
+        values = [
+            None if math.isnan(v) else v
+            for v in struct.unpack("<%dd" % (len(data) // 8), data)
+        ]
+        return {
+            "levels": {i: values[slot] for i, slot in self._output_slots.items()},
+            "occupancy": {
+                i: (
+                    None
+                    if values[slot] is None
+                    else OccupancyGroup.State(int(values[slot]))
+                )
+                for i, slot in self._group_slots.items()
+            },
+        }
+
+
+def _attach(name):
+    """Attaches to an existing segment without letting this process's resource
+    tracker remove it when the process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 always tracks the segment.
+        shm = shared_memory.SharedMemory(name=name)
+        # The tracker is shared with the publisher if it runs in this process.
+        if shm.name not in _published:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
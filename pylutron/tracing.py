@@ -0,0 +1,135 @@
+import threading
+
+from pylutron.logger import _LOGGER
+
+
+class Tracer(object):
+    """Receives timings of the receive and dispatch path. Install one with
+    Lutron.set_tracer(); subclasses override the methods they need. With no
+    tracer installed nothing is timed.
+
+    Stages (seconds, as measured with time.perf_counter()):
+      read: LutronConnection waiting for and reading what the repeater sent,
+            usually many lines at once (this includes idle time waiting for
+            the repeater; reads that time out without data aren't timed).
+      parse: Lutron._recv parsing a line and looking up the entity.
+      handle_update: the entity's handle_update(), including dispatch.
+      rules: evaluating the rules for one event.
+      dispatch: calling all the subscribers of one event.
+
+    Methods are called on the connection thread, or on whichever thread
+    dispatched an event (e.g. the scheduler's for gestures), and must be quick.
+    """
+
+    def stage(self, name, seconds):
+        """Called with the duration of one pass through a stage."""
+        pass
+
+    def handler(self, entity, event, handler, seconds):
+        """Called with the duration of one subscriber call."""
+        pass
+
+
+def _handler_name(handler):
+    name = getattr(handler, "__qualname__", None) or repr(handler)
+    module = getattr(handler, "__module__", None)
+    return "%s.%s" % (module, name) if module else name
+
+
+class _Timing(object):
+    __slots__ = ("seen", "calls", "total", "max")
+
+    def __init__(self):
+        # Timings seen, of which calls were aggregated.
+        self.seen = 0
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            "calls": self.seen,
+            "total_seconds": self.total * self.seen / self.calls if self.calls else 0.0,
+            "mean_seconds": self.total / self.calls if self.calls else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class ProfilingTracer(Tracer):
+    """A Tracer that logs slow subscribers and aggregates timings.
+
+    Every subscriber call slower than slow_threshold seconds is logged as a
+    warning and counted. For the cumulative report, only one in sample_every
+    timings of each stage and of each handler is aggregated, and totals are
+    scaled back up. Only the sampled timings take the lock, so a busy system
+    can be profiled continuously at low cost.
+    """
+
+    def __init__(self, slow_threshold=0.05, sample_every=1):
+        self._slow_threshold = slow_threshold
+        self._sample_every = max(int(sample_every), 1)
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._handlers = {}
+        self.slow_calls = 0
+
+    def stage(self, name, seconds):
+        timing = self._stages.get(name)
+        if timing is None:
+            timing = self._new_timing(self._stages, name)
+        self._sample(timing, seconds)
+
+    def _new_timing(self, timings, key):
+        with self._lock:
+            return timings.setdefault(key, _Timing())
+
+    def _sample(self, timing, seconds):
+        """Aggregates one in sample_every timings, counted per stage or handler
+        so that a fixed call pattern can't hide any of them."""
+        # Counted without the lock, which only the sampled timings take. A count
+        # lost to two threads racing only skews the estimate slightly.
+        seen = timing.seen + 1
+        timing.seen = seen
+        if seen % self._sample_every == 0:
+            with self._lock:
+                timing.add(seconds)
+
+    def handler(self, entity, event, handler, seconds):
+        if seconds > self._slow_threshold:
+            self.slow_calls += 1
+            _LOGGER.warning(
+                "Slow handler %s took %.1f ms for %s on %s"
+                % (_handler_name(handler), seconds * 1000, event, entity.name)
+            )
+        timing = self._handlers.get(handler)
+        if timing is None:
+            timing = self._new_timing(self._handlers, handler)
+        self._sample(timing, seconds)
+
+    def report(self, top=None):
+        """Returns {"stages": {name: stats}, "handlers": [stats]}, handlers
+        sorted by cumulative time, the most expensive first (only the top ones
+        if top is given). Totals are estimates when sampling."""
+        with self._lock:
+            stages = {name: timing.as_dict() for name, timing in self._stages.items()}
+            handlers = [
+                dict(timing.as_dict(), handler=_handler_name(handler))
+                for handler, timing in self._handlers.items()
+            ]
+        handlers.sort(key=lambda stats: stats["total_seconds"], reverse=True)
+        if top is not None:
+            handlers = handlers[:top]
+        return {"stages": stages, "handlers": handlers, "slow_calls": self.slow_calls}
+
+    def reset(self):
+        """Clears the aggregated timings."""
+        with self._lock:
+            self._stages = {}
+            self._handlers = {}
+            self.slow_calls = 0
@@ -0,0 +1,181 @@
+import select
+import socket
+import time
+
+# Telnet protocol bytes (RFC 854).
+_IAC = 255
+_DONT = 254
+_DO = 253
+_WONT = 252
+_WILL = 251
+_SB = 250
+_SE = 240
+
+
+class _SocketTransport(object):
+    """A TCP connection to the repeater's integration port, replacing
+    telnetlib (deprecated, and removed in Python 3.13).
+
+    The socket is non-blocking; reads wait with select() for up to their
+    timeout. Each read takes whatever arrived (up to _CHUNK_SIZE bytes) into a
+    reusable buffer, and read_lines() returns every complete line received so
+    far rather than one line per call.
+
+    The repeater only needs minimal telnet handling: IAC sequences are removed
+    from the data and option requests are refused (DO -> WONT, WILL -> DONT),
+    like telnetlib does by default. The refusals are queued rather than written
+    by the reading thread; the owner writes take_replies() under its own send
+    lock so they can't interleave with a command.
+    """
+
+    _CHUNK_SIZE = 65536
+
+    def __init__(self, host, port, timeout):
+        """Connects to host:port (or to the Unix socket host if port is None),
+        waiting up to timeout seconds to connect and for each write."""
+        self._timeout = timeout
+        if port is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            try:
+                self.sock.connect(host)
+            except OSError:
+                self.sock.close()
+                raise
+        else:
+            self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setblocking(False)
+        self._chunk = bytearray(_SocketTransport._CHUNK_SIZE)
+        self._view = memoryview(self._chunk)
+        # Received data (telnet sequences removed) not returned yet.
+        self._buffer = bytearray()
+        # Bytes of a telnet sequence split over two reads.
+        self._iac_partial = b""
+        self._in_sb = False
+        # Telnet negotiation replies not written yet, see take_replies().
+        self.replies = bytearray()
+
+    def close(self):
+        self.sock.close()
+
+    def shutdown(self):
+        """Shuts the connection down without closing the socket, so that a
+        read in progress on another thread gets EOF instead of using a closed
+        file descriptor. The reading thread then calls close()."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def write(self, data):
+        """Writes all of data, or raises OSError (socket.timeout if it couldn't
+        be written within the timeout)."""
+        view = memoryview(data)
+        sock = self.sock
+        while view:
+            try:
+                sent = sock.send(view)
+            except BlockingIOError:
+                if not select.select((), (sock,), (), self._timeout)[1]:
+                    raise socket.timeout("Timed out writing to the repeater")
+                continue
+            view = view[sent:]
+
+    def _fill(self, timeout):
+        """Reads what is available (waiting up to timeout seconds for it) into
+        the buffer. Returns False on timeout, raises EOFError once the
+        connection was closed."""
+        sock = self.sock
+        try:
+            n = sock.recv_into(self._chunk)
+        except BlockingIOError:
+            if not select.select((sock,), (), (), timeout)[0]:
+                return False
+            n = sock.recv_into(self._chunk)
+        if n == 0:
+            raise EOFError("Connection closed by the repeater")
+        if self._iac_partial or self._in_sb or self._chunk.find(_IAC, 0, n) >= 0:
+            self._buffer += self._process_telnet(self._view[:n])
+        else:
+            self._buffer += self._view[:n]
+        return True
+
+    def _process_telnet(self, data):
+        """Removes telnet sequences from data, answering option negotiation."""
+        data = self._iac_partial + bytes(data)
+        self._iac_partial = b""
+        out = bytearray()
+        replies = bytearray()
+        i, n = 0, len(data)
+        while i < n:
+            byte = data[i]
+            if byte != _IAC:
+                if not self._in_sb:
+                    out.append(byte)
+                i += 1
+                continue
+            if i + 1 >= n:
+                self._iac_partial = data[i:]
+                break
+            command = data[i + 1]
+            if command == _IAC:
+                if not self._in_sb:
+                    out.append(_IAC)
+                i += 2
+            elif command in (_DO, _DONT, _WILL, _WONT):
+                if i + 2 >= n:
+                    self._iac_partial = data[i:]
+                    break
+                if command == _DO:
+                    replies += bytes((_IAC, _WONT, data[i + 2]))
+                elif command == _WILL:
+                    replies += bytes((_IAC, _DONT, data[i + 2]))
+                i += 3
+            else:
+                if command == _SB:
+                    self._in_sb = True
+                elif command == _SE:
+                    self._in_sb = False
+                i += 2
+        self.replies += replies
+        return out
+
+    def take_replies(self):
+        """Returns and clears the queued telnet negotiation replies."""
+        replies = bytes(self.replies)
+        del self.replies[:]
+        return replies
+
+    def read_until(self, expected, timeout):
+        """Returns the data up to and including expected. If it didn't arrive
+        within timeout seconds, returns what was received instead."""
+        deadline = time.monotonic() + timeout
+        buf = self._buffer
+        while True:
+            index = buf.find(expected)
+            if index >= 0:
+                end = index + len(expected)
+                data = bytes(buf[:end])
+                del buf[:end]
+                return data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._fill(remaining):
+                data = bytes(buf)
+                del buf[:]
+                return data
+
+    def read_lines(self, timeout):
+        """Returns the complete lines (without the line terminator) received so
+        far, waiting up to timeout seconds for at least one. Returns an empty
+        list on timeout."""
+        buf = self._buffer
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if not self._fill(timeout):
+                return []
+            end = buf.rfind(b"\n")
+            if end < 0:
+                return []
+        lines = buf[:end].split(b"\n")
+        del buf[: end + 1]
+        return lines
@@ -0,0 +1,204 @@
+import collections
+import threading
+import time
+
+from pylutron.logger import _LOGGER
+
+
+class WriteResult(object):
+    """The outcome of a confirmed write.
+
+    output: the Output that was written.
+    level: the level that was requested.
+    confirmed: True if the repeater echoed the level, False if it never did
+               within the allowed attempts.
+    attempts: how many times the command was sent.
+    latency: seconds from the first send to the echo (None if not confirmed).
+    """
+
+    __slots__ = ("output", "level", "confirmed", "attempts", "latency")
+
+    def __init__(self, output, level, confirmed, attempts, latency):
+        self.output = output
+        self.level = level
+        self.confirmed = confirmed
+        self.attempts = attempts
+        self.latency = latency
+
+    def __repr__(self):
+        """Returns a stringified representation of this object."""
+        return str(
+            {
+                "output": self.output.id,
+                "level": self.level,
+                "confirmed": self.confirmed,
+                "attempts": self.attempts,
+                "latency": self.latency,
+            }
+        )
+
+
+class _PendingWrite(object):
+    __slots__ = (
+        "output",
+        "level",
+        "expected",
+        "fade_time",
+        "delay",
+        "command",
+        "attempts",
+        "first_sent",
+        "timer",
+    )
+
+    def __init__(self, output, level, fade_time, delay, command):
+        self.output = output
+        self.level = level
+        # Switched loads report 100 for any non-zero level.
+        self.expected = level if output.is_dimmable or level == 0 else 100.0
+        self.fade_time = fade_time
+        self.delay = delay
+        self.command = command
+        self.attempts = 0
+        self.first_sent = None
+        self.timer = None
+
+
+class WriteTracker(object):
+    """Tracks output level writes until the repeater confirms them.
+
+    Enabled with Lutron.enable_confirmed_writes(). Every level command sent
+    to an output is then pending until the repeater echoes the level back
+    (~OUTPUT,<id>,1,<level>). Outputs keep reporting the last confirmed level;
+    Output.pending_level returns the level still waiting for confirmation.
+    Unconfirmed commands are sent again after timeout seconds, up to
+    max_attempts sends in total, and are then reported as failed.
+
+    A newer write to an output supersedes its pending one. Any number of
+    outputs can have writes in flight; all the timeouts share the Lutron
+    scheduler thread.
+    """
+
+    _LATENCY_SAMPLES = 1000
+
+    def __init__(self, lutron, scheduler, timeout=2.0, max_attempts=3):
+        self._lutron = lutron
+        self._scheduler = scheduler
+        self._timeout = timeout
+        self._max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._handlers = []
+        self._latencies = collections.deque(maxlen=WriteTracker._LATENCY_SAMPLES)
+        self._confirmed = 0
+        self._failed = 0
+        self._superseded = 0
+        self._retries = 0
+
+    def subscribe(self, handler):
+        """Registers handler(result), called with a WriteResult whenever a
+        write is confirmed or fails. It runs on the connection thread (for
+        confirmations) or the scheduler thread (for failures)."""
+        self._handlers.append(handler)
+
+    def pending_level(self, output):
+        """Returns the level of the write pending for output, or None."""
+        pending = self._pending.get(output)
+        return pending.level if pending is not None else None
+
+    @property
+    def in_flight(self):
+        """Returns the number of writes waiting for confirmation."""
+        return len(self._pending)
+
+    def stats(self):
+        """Returns a dict of counters and latency statistics (in seconds) over
+        the most recent confirmed writes."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            result = {
+                "pending": len(self._pending),
+                "confirmed": self._confirmed,
+                "failed": self._failed,
+                "superseded": self._superseded,
+                "retries": self._retries,
+            }
+        if latencies:
+            result["latency_avg"] = sum(latencies) / len(latencies)
+            result["latency_p50"] = latencies[len(latencies) // 2]
+            result["latency_p95"] = latencies[int(len(latencies) * 0.95)]
+            result["latency_max"] = latencies[-1]
+        return result
+
+    def _track(self, output, level, fade_time, delay, command):
+        """Records a level write that's about to be sent."""
+        pending = _PendingWrite(output, level, fade_time, delay, command)
+        with self._lock:
+            previous = self._pending.get(output)
+            if previous is not None:
+                previous.timer.cancel()
+                self._superseded += 1
+            self._pending[output] = pending
+            self._mark_sent_locked(pending)
+
+    def _mark_sent_locked(self, pending):
+        now = time.monotonic()
+        if pending.first_sent is None:
+            pending.first_sent = now
+        pending.attempts += 1
+        pending.timer = self._scheduler.call_later(
+            self._timeout, self._on_timeout, pending
+        )
+
+    def _on_timeout(self, pending):
+        with self._lock:
+            if self._pending.get(pending.output) is not pending:
+                return
+            if pending.attempts < self._max_attempts:
+                self._retries += 1
+                self._mark_sent_locked(pending)
+                retry = True
+            else:
+                del self._pending[pending.output]
+                self._failed += 1
+                retry = False
+        if retry:
+            _LOGGER.debug(
+                "Retrying level %.2f on output %d (attempt %d)"
+                % (pending.level, pending.output.id, pending.attempts)
+            )
+            self._lutron.send_raw(pending.command)
+            return
+        _LOGGER.warning(
+            "Level %.2f on output %d not confirmed after %d attempts"
+            % (pending.level, pending.output.id, pending.attempts)
+        )
+        self._report(
+            WriteResult(pending.output, pending.level, False, pending.attempts, None)
+        )
+
+    def _handle_echo(self, output, level):
+        """Called by Output.handle_update with a reported level. Confirms the
+        pending write if the level matches it."""
+        pending = self._pending.get(output)
+        if pending is None or abs(level - pending.expected) >= 0.01:
+            return
+        with self._lock:
+            if self._pending.get(output) is not pending:
+                return
+            del self._pending[output]
+            pending.timer.cancel()
+            latency = time.monotonic() - pending.first_sent
+            self._latencies.append(latency)
+            self._confirmed += 1
+        output._apply_level(pending.expected, pending.fade_time, pending.delay)
+        self._report(
+            WriteResult(output, pending.level, True, pending.attempts, latency)
+        )
+
+    def _report(self, result):
+        for handler in self._handlers:
+            try:
+                handler(result)
+            except Exception:
+                _LOGGER.exception("Error in write result handler")
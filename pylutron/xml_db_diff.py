@@ -0,0 +1,140 @@
+class XmlDbDiff(object):
+    """The differences found by Lutron.reload_xml_db() between the live entity
+    graph and a freshly parsed XML database.
+
+    added: entities that only exist in the new database.
+    removed: entities that no longer exist; they stop receiving updates.
+    changed: live entities whose XML attributes (name, type, integration id,
+             etc.) were updated in place.
+    areas_added / areas_removed: the same for Areas.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.areas_added = []
+        self.areas_removed = []
+
+    def __bool__(self):
+        """True if anything changed."""
+        return bool(
+            self.added
+            or self.removed
+            or self.changed
+            or self.areas_added
+            or self.areas_removed
+        )
+
+    def __repr__(self):
+        return str(
+            {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "changed": len(self.changed),
+                "areas_added": len(self.areas_added),
+                "areas_removed": len(self.areas_removed),
+            }
+        )
+
+
+def _iter_entities(areas):
+    """Yields every entity reachable from areas once, building lazy ones."""
+    # Several areas can share an occupancy group.
+    groups = set()
+    for area in areas:
+        group = area.occupancy_group
+        if group and id(group) not in groups:
+            groups.add(id(group))
+            yield group
+        yield from area.outputs
+        for keypad in area.keypads:
+            yield keypad
+            yield from keypad.buttons
+            yield from keypad.leds
+        yield from area.sensors
+        yield from area.shade_groups
+
+
+def _id_key(entity):
+    """Secondary match key for entities whose UUID changed or is missing."""
+    keypad = getattr(entity, "_keypad", None)
+    if keypad is not None:
+        return (type(entity), keypad.id, entity.component_number)
+    return (type(entity), entity.id)
+
+
+def merge_areas(live_areas, new_areas):
+    """Merges new_areas (freshly parsed) into live_areas.
+
+    Entities are matched by UUID, falling back to integration id. Matched live
+    entities are kept (together with their subscribers and cached state) and
+    updated in place; the new tree is rewired to use them.
+
+    Returns a (areas, diff, substitute) tuple: the merged list of areas, an
+    XmlDbDiff, and a function mapping a newly parsed entity to the object that
+    replaces it in the merged graph.
+    """
+    diff = XmlDbDiff()
+    live = list(_iter_entities(live_areas))
+    by_uuid = {e.uuid: e for e in live if e.uuid}
+    by_id = {_id_key(e): e for e in live}
+
+    replacements = {}
+    matched = set()
+    for new in _iter_entities(new_areas):
+        old = by_uuid.get(new.uuid) if new.uuid else None
+        if old is None or type(old) is not type(new) or id(old) in matched:
+            old = by_id.get(_id_key(new))
+        if old is None or type(old) is not type(new) or id(old) in matched:
+            diff.added.append(new)
+            continue
+        matched.add(id(old))
+        replacements[id(new)] = old
+        if old._update_from(new):
+            diff.changed.append(old)
+    diff.removed = [e for e in live if id(e) not in matched]
+
+    def substitute(entity):
+        return replacements.get(id(entity), entity)
+
+    live_by_id = {area.id: area for area in live_areas}
+    area_map = {}
+    for new_area in new_areas:
+        area = live_by_id.pop(new_area.id, None)
+        if area is None:
+            area = new_area
+            diff.areas_added.append(area)
+        area_map[id(new_area)] = area
+
+    areas = []
+    for new_area in new_areas:
+        area = area_map[id(new_area)]
+        keypads = []
+        for new_keypad in new_area.keypads:
+            keypad = substitute(new_keypad)
+            keypad._set_components(
+                [substitute(b) for b in new_keypad.buttons],
+                [substitute(l) for l in new_keypad.leds],
+            )
+            keypads.append(keypad)
+        for new_group in new_area.shade_groups:
+            substitute(new_group)._set_shades([substitute(s) for s in new_group.shades])
+        area._set_contents(
+            new_area.name,
+            area_map[id(new_area.parent)] if new_area.parent else None,
+            [area_map[id(child)] for child in new_area.children],
+            [substitute(o) for o in new_area.outputs],
+            keypads,
+            [substitute(s) for s in new_area.sensors],
+            [substitute(g) for g in new_area.shade_groups],
+        )
+        area._occupancy_group = substitute(new_area.occupancy_group)
+        if area._occupancy_group:
+            area._occupancy_group._area = area
+        areas.append(area)
+    for area in areas:
+        if area.parent is None:
+            area._update_subtree()
+    diff.areas_removed = list(live_by_id.values())
+    return areas, diff, substitute
@@ -0,0 +1,166 @@
+import gzip
+import json
+import os
+import tempfile
+import urllib.error
+import urllib.request
+
+from pylutron.logger import _LOGGER
+
+
+class XmlDbFetcher(object):
+    """Fetches the DbXmlInfo.xml project database from the repeater.
+
+    A local cache can be kept at cache_path. Alongside it, a small metadata file
+    (cache_path + ".meta") remembers the HTTP validators (ETag, Last-Modified,
+    Content-Length) the repeater sent with the cached copy. When validating, we
+    send a conditional request and only download the body if the repeater says
+    the project has changed (or doesn't support the validators at all).
+
+    Downloads are streamed in chunks into a temporary file next to the cache and
+    then atomically moved into place, so a crash mid-download never leaves a
+    truncated cache behind. The cache can optionally be stored gzip-compressed.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    # Headers from the response we keep to validate the cached copy later.
+    _VALIDATORS = ("ETag", "Last-Modified", "Content-Length")
+
+    def __init__(self, host, cache_path=None, compress=None, timeout=10):
+        """Initializes the fetcher, no request is made.
+
+        compress: store the cache gzip-compressed. Defaults to True if cache_path
+                  ends with ".gz". Reading detects compression automatically.
+        """
+        self._url = "http://" + host + "/DbXmlInfo.xml"
+        self._cache_path = cache_path
+        if compress is None:
+            compress = bool(cache_path) and cache_path.endswith(".gz")
+        self._compress = compress
+        self._timeout = timeout
+
+    @property
+    def _meta_path(self):
+        return self._cache_path + ".meta"
+
+    def fetch(self, validate=True):
+        """Returns a (xml_db, loaded_from) tuple, where loaded_from is "cache" or
+        "repeater".
+
+        If validate is False, an existing cache is used without contacting the
+        repeater at all.
+        """
+        cached = self._read_cache()
+        if cached is not None and not validate:
+            return cached, "cache"
+
+        meta = self._read_meta() if cached is not None else {}
+        request = urllib.request.Request(self._url)
+        if meta.get("ETag"):
+            request.add_header("If-None-Match", meta["ETag"])
+        if meta.get("Last-Modified"):
+            request.add_header("If-Modified-Since", meta["Last-Modified"])
+
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                if cached is not None and self._matches(meta, response.headers):
+                    _LOGGER.debug("Cached xml db is up to date (headers match)")
+                    return cached, "cache"
+                xml_db = self._download(response)
+        except (urllib.error.URLError, OSError) as e:
+            # HTTPError is a URLError too: an error status (e.g. a repeater
+            # answering 503) falls back to the cache like a refused connection.
+            if cached is None:
+                raise
+            if isinstance(e, urllib.error.HTTPError) and e.code == 304:
+                _LOGGER.debug("Cached xml db is up to date (not modified)")
+                return cached, "cache"
+            _LOGGER.warning(
+                "Unable to validate cached xml db, using the cached copy",
+                exc_info=True,
+            )
+            return cached, "cache"
+        return xml_db, "repeater"
+
+    @staticmethod
+    def _matches(meta, headers):
+        """Returns True if the response describes the same document as the cache.
+
+        Repeaters that ignore conditional requests still send the validators, so
+        we can skip the body. Content-Length alone isn't trusted since a
+        reprogrammed project can easily keep the same size.
+        """
+        if not (headers.get("ETag") or headers.get("Last-Modified")):
+            return False
+        for name in XmlDbFetcher._VALIDATORS:
+            if headers.get(name) != meta.get(name):
+                return False
+        return True
+
+    def _download(self, response):
+        """Streams the response body, writing it to the cache if there is one."""
+        chunks = []
+        if not self._cache_path:
+            for chunk in iter(lambda: response.read(self.CHUNK_SIZE), b""):
+                chunks.append(chunk)
+            return b"".join(chunks)
+
+        cache_dir = os.path.dirname(os.path.abspath(self._cache_path))
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".DbXmlInfo.")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                out = gzip.GzipFile(fileobj=raw, mode="wb") if self._compress else raw
+                try:
+                    for chunk in iter(lambda: response.read(self.CHUNK_SIZE), b""):
+                        chunks.append(chunk)
+                        out.write(chunk)
+                finally:
+                    if out is not raw:
+                        out.close()
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, self._cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._write_meta(
+            {name: response.headers.get(name) for name in self._VALIDATORS}
+        )
+        return b"".join(chunks)
+
+    def _read_cache(self):
+        """Returns the cached xml db, or None if there isn't a usable one."""
+        if not self._cache_path:
+            return None
+        try:
+            with open(self._cache_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:2] == b"\x1f\x8b":
+            try:
+                return gzip.decompress(data)
+            except (OSError, EOFError):
+                _LOGGER.warning("Corrupt compressed xml db cache, ignoring it")
+                return None
+        return data
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, meta):
+        """Atomically replaces the cache metadata file."""
+        cache_dir = os.path.dirname(os.path.abspath(self._cache_path))
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".DbXmlInfo.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
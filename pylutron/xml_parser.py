@@ -1,9 +1,13 @@
+import sys
+
 from pylutron.logger import _LOGGER
 from pylutron.area import Area
+from pylutron.registry import EntityRegistry
 from pylutron.entities import (
     Output,
     Keypad,
     Shade,
+    ShadeGroup,
     Button,
     Led,
     MotionSensor,
@@ -11,6 +15,12 @@ from pylutron.entities import (
 )
 
 
+def _intern(value):
+    """Interns strings that repeat across many entities (types, engravings) so
+    that large projects share a single copy of each."""
+    return sys.intern(value) if value is not None else None
+
+
 class LutronXmlDbParser(object):
     """The parser for Lutron XML database.
 
@@ -18,12 +28,21 @@ class LutronXmlDbParser(object):
     (Output). We handle the most relevant features, but some things like LEDs,
     etc. are not implemented."""
 
-    def __init__(self, lutron, xml_db_str):
-        """Initializes the XML parser, takes the raw XML data as string input."""
+    def __init__(self, lutron, xml_db_str, lazy=False):
+        """Initializes the XML parser, takes the raw XML data as string input.
+
+        If lazy is True, keypad components and motion sensors are not constructed
+        during parsing; only what's needed to build them on demand is kept."""
         self._lutron = lutron
         self._xml_db_str = xml_db_str
+        self._lazy = lazy
         self.areas = []
+        self.registry = EntityRegistry()
         self._occupancy_groups = {}
+        # Integration id -> Output, and the (shade group, area, member Output
+        # XMLs) whose members are bound once all the areas are parsed.
+        self._outputs = {}
+        self._shade_group_members = []
         self.project_name = None
         # Imports here to prevent circular imports!?!
 
@@ -64,15 +83,20 @@ class LutronXmlDbParser(object):
         # "house". It contains the real nested Areas tree, which is the one we want.
         top_area = root.find("Areas").find("Area")
         self.project_name = top_area.get("Name")
-        areas = top_area.find("Areas")
-        for area_xml in areas.iter("Area"):
-            area = self._parse_area(area_xml)
-            self.areas.append(area)
+        top_areas = [
+            self._parse_area(area_xml)
+            for area_xml in top_area.find("Areas").findall("Area")
+        ]
+        self._bind_shade_groups()
+        for area in top_areas:
+            area._update_subtree()
         return True
 
-    def _parse_area(self, area_xml):
+    def _parse_area(self, area_xml, parent=None):
         """Parses an Area tag, which is effectively a room, depending on how the
-        Lutron controller programming was done."""
+        Lutron controller programming was done. Nested areas are parsed
+        recursively and attached as children; every area is also appended to the
+        flat self.areas list (parents before their children)."""
         occupancy_group_id = area_xml.get("OccupancyGroupAssignedToID")
         occupancy_group = self._occupancy_groups.get(occupancy_group_id)
         area_name = area_xml.get("Name")
@@ -87,10 +111,22 @@ class LutronXmlDbParser(object):
             name=area_name,
             integration_id=int(area_xml.get("IntegrationID")),
             occupancy_group=occupancy_group,
+            parent=parent,
         )
+        self.areas.append(area)
+        if occupancy_group:
+            self.registry.add(occupancy_group, area)
         for output_xml in area_xml.find("Outputs"):
             output = self._parse_output(output_xml)
+            self._outputs[output.id] = output
             area.add_output(output)
+            self.registry.add(output, area)
+        shade_groups = area_xml.find("ShadeGroups")
+        if shade_groups is not None:
+            for shade_group_xml in shade_groups.findall("ShadeGroup"):
+                shade_group = self._parse_shade_group(shade_group_xml, area)
+                area.add_shade_group(shade_group)
+                self.registry.add(shade_group, area)
         # device group in our case means keypad
         # device_group.get('Name') is the location of the keypad
         for device_group in area_xml.find("DeviceGroups"):
@@ -115,16 +151,45 @@ class LutronXmlDbParser(object):
                 ):
                     keypad = self._parse_keypad(device_xml, device_group)
                     area.add_keypad(keypad)
+                    self._register_keypad(keypad, area)
                 elif device_xml.get("DeviceType") == "MOTION_SENSOR":
+                    if self._lazy:
+                        area.add_lazy_sensor(self._motion_sensor_args(device_xml))
+                        continue
                     motion_sensor = self._parse_motion_sensor(device_xml)
                     area.add_sensor(motion_sensor)
+                    self.registry.add(motion_sensor, area)
                 # elif device_xml.get('DeviceType') == 'VISOR_CONTROL_RECEIVER':
+        if area._lazy_sensors is not None:
+            self.registry.add_pending(
+                (MotionSensor,),
+                lambda: [self.registry.add(s, area) for s in area.sensors],
+            )
+        children = area_xml.find("Areas")
+        if children is not None:
+            for child_xml in children.findall("Area"):
+                area.add_child(self._parse_area(child_xml, parent=area))
         return area
 
+    def _register_keypad(self, keypad, area):
+        """Adds the keypad and its components to the registry. Lazily added
+        components are registered once they're built."""
+        self.registry.add(keypad, area)
+        if keypad._lazy_components is not None:
+            self.registry.add_pending(
+                (Button, Led),
+                lambda: [
+                    self.registry.add(c, area) for c in keypad.buttons + keypad.leds
+                ],
+            )
+            return
+        for component in keypad.buttons + keypad.leds:
+            self.registry.add(component, area)
+
     def _parse_output(self, output_xml):
         """Parses an output, which is generally a switch controlling a set of
         lights/outlets, etc."""
-        output_type = output_xml.get("OutputType")
+        output_type = _intern(output_xml.get("OutputType"))
         kwargs = {
             "name": output_xml.get("Name"),
             "watts": int(output_xml.get("Wattage")),
@@ -136,12 +201,50 @@ class LutronXmlDbParser(object):
             return Shade(self._lutron, **kwargs)
         return Output(self._lutron, **kwargs)
 
+    def _parse_shade_group(self, shade_group_xml, area):
+        """Parses a shade group. Its member shades, listed under the group's own
+        Outputs, are bound by _bind_shade_groups() once all the areas are
+        parsed, since they may be listed in another area's Outputs."""
+        shade_group = ShadeGroup(
+            self._lutron,
+            name=shade_group_xml.get("Name"),
+            integration_id=int(shade_group_xml.get("IntegrationID")),
+            uuid=shade_group_xml.get("UUID"),
+        )
+        outputs = shade_group_xml.find("Outputs")
+        if outputs is not None:
+            self._shade_group_members.append(
+                (shade_group, area, outputs.findall("Output"))
+            )
+        return shade_group
+
+    def _bind_shade_groups(self):
+        """Adds the member shades to the shade groups. Shades that aren't in any
+        area's Outputs are added to the area of their group."""
+        for shade_group, area, outputs_xml in self._shade_group_members:
+            for output_xml in outputs_xml:
+                shade = self._outputs.get(int(output_xml.get("IntegrationID")))
+                if shade is None:
+                    shade = self._parse_output(output_xml)
+                    self._outputs[shade.id] = shade
+                    area.add_output(shade)
+                    self.registry.add(shade, area)
+                if isinstance(shade, Shade):
+                    shade_group.add_shade(shade)
+                else:
+                    _LOGGER.warning(
+                        "Output %d in shade group %s is not a shade",
+                        shade.id,
+                        shade_group.name,
+                    )
+        self._shade_group_members = []
+
     def _parse_keypad(self, keypad_xml, device_group):
         """Parses a keypad device (the Visor receiver is technically a keypad too)."""
         keypad = Keypad(
             self._lutron,
             name=keypad_xml.get("Name"),
-            keypad_type=keypad_xml.get("DeviceType"),
+            keypad_type=_intern(keypad_xml.get("DeviceType")),
             location=device_group.get("Name"),
             integration_id=int(keypad_xml.get("IntegrationID")),
             uuid=keypad_xml.get("UUID"),
@@ -153,7 +256,21 @@ class LutronXmlDbParser(object):
             if comp.tag != "Component":
                 continue
             comp_type = comp.get("ComponentType")
-            if comp_type == "BUTTON":
+            if self._lazy and comp_type == "BUTTON":
+                keypad.add_lazy_component(
+                    comp_type,
+                    int(comp.get("ComponentNumber")),
+                    Button,
+                    self._button_args(comp),
+                )
+            elif self._lazy and comp_type == "LED":
+                keypad.add_lazy_component(
+                    comp_type,
+                    int(comp.get("ComponentNumber")),
+                    Led,
+                    self._led_args(keypad, comp),
+                )
+            elif comp_type == "BUTTON":
                 button = self._parse_button(keypad, comp)
                 keypad.add_button(button)
             elif comp_type == "LED":
@@ -163,42 +280,46 @@ class LutronXmlDbParser(object):
 
     def _parse_button(self, keypad, component_xml):
         """Parses a button device that part of a keypad."""
+        return Button(self._lutron, keypad, *self._button_args(component_xml))
+
+    def _button_args(self, component_xml):
+        """Extracts the Button constructor arguments (after lutron and keypad)
+        from a component, as a compact tuple."""
         button_xml = component_xml.find("Button")
         name = button_xml.get("Engraving")
-        button_type = button_xml.get("ButtonType")
-        direction = button_xml.get("Direction")
+        button_type = _intern(button_xml.get("ButtonType"))
+        direction = _intern(button_xml.get("Direction"))
         # Hybrid keypads have dimmer buttons which have no engravings.
         if button_type == "SingleSceneRaiseLower":
             name = "Dimmer " + direction
         if not name:
             name = "Unknown Button"
-        button = Button(
-            self._lutron,
-            keypad,
-            name=name,
-            num=int(component_xml.get("ComponentNumber")),
-            button_type=button_type,
-            direction=direction,
-            uuid=button_xml.get("UUID"),
+        return (
+            _intern(name),
+            int(component_xml.get("ComponentNumber")),
+            button_type,
+            direction,
+            button_xml.get("UUID"),
         )
-        return button
 
     def _parse_led(self, keypad, component_xml):
         """Parses an LED device that part of a keypad."""
+        return Led(self._lutron, keypad, *self._led_args(keypad, component_xml))
+
+    def _led_args(self, keypad, component_xml):
+        """Extracts the Led constructor arguments (after lutron and keypad) from
+        a component, as a compact tuple."""
         component_num = int(component_xml.get("ComponentNumber"))
         led_base = 80
         if keypad.type == "MAIN_REPEATER":
             led_base = 100
         led_num = component_num - led_base
-        led = Led(
-            self._lutron,
-            keypad,
-            name=("LED %d" % led_num),
-            led_num=led_num,
-            component_num=component_num,
-            uuid=component_xml.find("LED").get("UUID"),
+        return (
+            _intern("LED %d" % led_num),
+            led_num,
+            component_num,
+            component_xml.find("LED").get("UUID"),
         )
-        return led
 
     def _parse_motion_sensor(self, sensor_xml):
         """Parses a motion sensor object.
@@ -208,11 +329,14 @@ class LutronXmlDbParser(object):
         groups, what's assigned to them, and when they go (un)occupied. We'll handle
         this later.
         """
-        return MotionSensor(
-            self._lutron,
-            name=sensor_xml.get("Name"),
-            integration_id=int(sensor_xml.get("IntegrationID")),
-            uuid=sensor_xml.get("UUID"),
+        return MotionSensor(self._lutron, *self._motion_sensor_args(sensor_xml))
+
+    def _motion_sensor_args(self, sensor_xml):
+        """Extracts the MotionSensor constructor arguments (after lutron)."""
+        return (
+            sensor_xml.get("Name"),
+            int(sensor_xml.get("IntegrationID")),
+            sensor_xml.get("UUID"),
         )
 
     def _parse_occupancy_group(self, group_xml):